@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Count the HTTP round trips and connections needed to look up users in FASJSON.
+
+A local server stands in for FASJSON behind mod_auth_gssapi: it asks for Negotiate
+authentication, and optionally answers with a session cookie. There is no KDC, so the client's
+GSSAPI security context is replaced with one that returns a dummy token.
+
+Usage: python devel/benchmarks/fasjson_round_trips.py
+"""
+
+import asyncio
+import time
+from collections import Counter
+from unittest import mock
+
+import httpx
+import uvicorn
+from httpx_gssapi import HTTPSPNEGOAuth
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from webhook_to_fedora_messaging.cache import configure_cache
+from webhook_to_fedora_messaging.fasjson import FASJSONAsyncProxy
+
+
+LOOKUPS = 500
+CONCURRENCY = 20
+PORT = 8765
+BASE_URL = f"http://127.0.0.1:{PORT}"
+SESSION_COOKIE = "gssapi_session"
+
+
+class FakeSecurityContext:
+    def step(self, token: bytes | None) -> bytes:
+        return b"dummy-token"
+
+
+class StubServer:
+    def __init__(self) -> None:
+        self.sessions = False
+        self.counts: Counter[str] = Counter()
+        self.connections: set[int] = set()
+        self.app = Starlette(routes=[Route("/v1/search/users/", self.search_users)])
+
+    async def search_users(self, request: Request) -> JSONResponse:
+        self.counts["requests"] += 1
+        if request.client is not None:
+            self.connections.add(request.client.port)
+        if self.sessions and SESSION_COOKIE in request.cookies:
+            return JSONResponse({"result": []})
+        if not request.headers.get("Authorization", "").startswith("Negotiate "):
+            return JSONResponse(
+                {"message": "Unauthorized"},
+                status_code=401,
+                headers={"WWW-Authenticate": "Negotiate"},
+            )
+        self.counts["negotiations"] += 1
+        response = JSONResponse({"result": []})
+        if self.sessions:
+            response.set_cookie(SESSION_COOKIE, "dummy-session")
+        return response
+
+
+def client_before() -> httpx.AsyncClient:
+    # The previous implementation
+    return httpx.AsyncClient(base_url=f"{BASE_URL}/v1", auth=HTTPSPNEGOAuth())
+
+
+def client_after() -> httpx.AsyncClient:
+    return FASJSONAsyncProxy(BASE_URL).client
+
+
+async def run(server: StubServer, client: httpx.AsyncClient) -> tuple[float, Counter[str], int]:
+    server.counts.clear()
+    server.connections.clear()
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def lookup(index: int) -> None:
+        async with semaphore:
+            response = await client.get(
+                "/search/users/", params={"github_username": f"login-{index}"}
+            )
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[lookup(index) for index in range(LOOKUPS)])
+    duration = time.perf_counter() - start
+    await client.aclose()
+    return duration, server.counts.copy(), len(server.connections)
+
+
+async def main() -> None:
+    configure_cache()
+    server = StubServer()
+    uvicorn_server = uvicorn.Server(
+        uvicorn.Config(server.app, port=PORT, log_level="warning", access_log=False)
+    )
+    serving = asyncio.create_task(uvicorn_server.serve())
+    while not uvicorn_server.started:
+        await asyncio.sleep(0.01)
+
+    print(f"{LOOKUPS} lookups, {CONCURRENCY} at a time")
+    print(
+        f"{'server sessions':>16} {'client':>7} {'round trips':>12} {'negotiations':>13} "
+        f"{'connections':>12} {'duration':>9}"
+    )
+    with mock.patch.object(HTTPSPNEGOAuth, "_make_context", return_value=FakeSecurityContext()):
+        for sessions in (False, True):
+            server.sessions = sessions
+            for name, make_client in (("before", client_before), ("after", client_after)):
+                duration, counts, connections = await run(server, make_client())
+                print(
+                    f"{'on' if sessions else 'off':>16} {name:>7} "
+                    f"{counts['requests'] / LOOKUPS:>12.2f} "
+                    f"{counts['negotiations'] / LOOKUPS:>13.2f} "
+                    f"{connections:>12} {duration * 1000:>7.0f}ms"
+                )
+
+    uvicorn_server.should_exit = True
+    await serving
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
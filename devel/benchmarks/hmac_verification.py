@@ -0,0 +1,96 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Measure how long the event loop is blocked while verifying webhook signatures.
+
+A ticker task records the delay between the time it should have woken up and the time it
+actually did, while payloads of various sizes are verified concurrently. The payloads are read
+from the request in chunks of 64 KiB, like uvicorn passes them.
+
+Usage: python devel/benchmarks/hmac_verification.py
+"""
+
+import asyncio
+import hashlib
+import hmac
+import time
+from typing import Any
+
+from payloads import load_data, SIZES
+from starlette.requests import Request
+
+from webhook_to_fedora_messaging.endpoints.parser.github import GitHubParser
+
+
+TOKEN = "benchmark-token"  # noqa: S105
+CONCURRENCY = 20
+TICK = 0.001
+CHUNK_SIZE = 64 * 1024
+
+
+def sign(data: bytes) -> str:
+    return "sha256=" + hmac.new(TOKEN.encode(), msg=data, digestmod="sha256").hexdigest()
+
+
+async def verify_before(sig_header: str, data: bytes) -> None:
+    # The previous implementation, on the event loop
+    algorithm, signature = sig_header.split("=", 1)
+    algo_function = getattr(hashlib, algorithm)
+    hash_object = hmac.new(TOKEN.encode("utf-8"), msg=data, digestmod=algo_function)
+    if not hmac.compare_digest(hash_object.hexdigest(), signature):
+        raise ValueError("Signature mismatch")
+
+
+async def verify_after(sig_header: str, data: bytes) -> None:
+    chunks = [data[start : start + CHUNK_SIZE] for start in range(0, len(data), CHUNK_SIZE)]
+    headers = [
+        (b"x-hub-signature-256", sig_header.encode()),
+        (b"content-length", str(len(data)).encode()),
+    ]
+
+    async def receive() -> dict[str, Any]:
+        body = chunks.pop(0)
+        return {"type": "http.request", "body": body, "more_body": bool(chunks)}
+
+    request = Request({"type": "http", "method": "POST", "headers": headers}, receive)
+    await GitHubParser(TOKEN, request).get_headers_and_data()
+
+
+async def measure(verify, data: bytes) -> tuple[float, float]:  # type: ignore[no-untyped-def]
+    lags: list[float] = []
+    stop = asyncio.Event()
+
+    async def ticker() -> None:
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(max(0.0, time.perf_counter() - start - TICK))
+
+    sig_header = sign(data)
+    # Warm up (configuration loading, worker threads startup)
+    await asyncio.gather(*[verify(sig_header, data) for _ in range(CONCURRENCY)])
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK * 2)
+    await asyncio.gather(*[verify(sig_header, data) for _ in range(CONCURRENCY)])
+    stop.set()
+    await ticker_task
+    return max(lags), sum(lags)
+
+
+async def main() -> None:
+    print(f"{CONCURRENCY} concurrent verifications, event loop lag in ms")
+    print(f"{'size':>10} {'max before':>11} {'max after':>10} {'sum before':>11} {'sum after':>10}")
+    for commits in SIZES:
+        data = load_data("github", commits)
+        before = await measure(verify_before, data)
+        after = await measure(verify_after, data)
+        print(
+            f"{len(data):>10} {before[0] * 1e3:>11.2f} {after[0] * 1e3:>10.2f} "
+            f"{before[1] * 1e3:>11.2f} {after[1] * 1e3:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Compare decoding the webhook payload twice (FastAPI's body argument, then the parser) with
+decoding it once in the parser.
+
+Usage: python devel/benchmarks/json_parsing.py
+"""
+
+import json
+import timeit
+from functools import partial
+
+from payloads import KINDS, load_data, SIZES
+
+from webhook_to_fedora_messaging.endpoints.parser.base import json_loads
+
+
+def before(data: bytes) -> None:
+    # FastAPI's Request.json()
+    json.loads(data)
+    # BaseParser.parse()
+    json.loads(data.decode("utf-8"))
+
+
+def after(data: bytes) -> None:
+    json_loads(data)
+
+
+def main() -> None:
+    print(f"JSON decoder: {json_loads.__module__}")
+    print(f"{'payload':<10} {'commits':>8} {'size':>10} {'before':>10} {'after':>10} {'saved':>6}")
+    for kind in KINDS:
+        for commits in SIZES:
+            data = load_data(kind, commits)
+            number = max(1, 2000 // commits)
+            results = {}
+            for name, function in (("before", before), ("after", after)):
+                timer = timeit.Timer(partial(function, data))
+                results[name] = min(timer.repeat(repeat=5, number=number)) / number
+            saved = 1 - results["after"] / results["before"]
+            print(
+                f"{kind:<10} {commits:>8} {len(data):>10} {results['before'] * 1e3:>8.3f}ms "
+                f"{results['after'] * 1e3:>8.3f}ms {saved:>6.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
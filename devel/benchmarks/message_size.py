@@ -0,0 +1,93 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Compare the size of the published messages with all the request headers and the full payloads,
+with the headers of the parsers' allowlists, and with the payloads pruned by the parsers' default
+profiles.
+
+The headers are those of the test fixtures, with the ones usually added by the HTTP clients of
+the forges and by the proxies in front of the application.
+
+Usage: python devel/benchmarks/message_size.py
+"""
+
+import asyncio
+from unittest import mock
+
+from fedora_messaging import message as fm_message
+from payloads import KINDS, load_data, load_headers, SIZES
+
+from webhook_to_fedora_messaging.endpoints.parser import PARSERS
+from webhook_to_fedora_messaging.pruning import NO_PRUNING
+
+
+EXTRA_HEADERS = {
+    "github": {
+        "host": "webhook.fedoraproject.org",
+        "user-agent": "GitHub-Hookshot/7b9ae7d",
+        "accept": "*/*",
+        "content-length": "7352",
+        "x-forwarded-for": "140.82.115.10",
+        "x-forwarded-host": "webhook.fedoraproject.org",
+        "x-forwarded-port": "443",
+        "x-forwarded-proto": "https",
+        "x-forwarded-server": "proxy01.fedoraproject.org",
+        "x-real-ip": "140.82.115.10",
+        "forwarded": "for=140.82.115.10;host=webhook.fedoraproject.org;proto=https",
+        "connection": "close",
+    },
+    "forgejo": {
+        "x-forwarded-host": "webhook.fedoraproject.org",
+        "x-forwarded-port": "443",
+        "x-forwarded-server": "proxy01.fedoraproject.org",
+        "x-real-ip": "217.197.91.145",
+        "x-forgejo-signature": "0e44dae9a9c979dc05d1f5846b06fe578e5815330e44dae9a9c979dc05d1f584",
+        "x-gitea-delivery": "3a7eee03-a3b4-473e-be5a-9e73f44bc382",
+        "x-gitea-event": "push",
+        "x-gitea-event-type": "push",
+        "x-gitea-signature": "0e44dae9a9c979dc05d1f5846b06fe578e5815330e44dae9a9c979dc05d1f584",
+        "x-gogs-delivery": "3a7eee03-a3b4-473e-be5a-9e73f44bc382",
+        "x-gogs-event": "push",
+        "x-gogs-event-type": "push",
+        "x-gogs-signature": "0e44dae9a9c979dc05d1f5846b06fe578e5815330e44dae9a9c979dc05d1f584",
+    },
+}
+
+
+async def message_size(
+    kind: str, data: bytes, header_allowlist: list[str] | None, prune: bool
+) -> int:
+    parser_class = PARSERS[kind]
+    headers = {**load_headers(kind), **EXTRA_HEADERS[kind]}
+    parser = parser_class(
+        "",
+        mock.Mock(),
+        header_allowlist=header_allowlist,
+        pruning_profiles=None if prune else NO_PRUNING,
+    )
+    with mock.patch.object(parser_class, "get_agent", return_value="dummy-fas-username"):
+        message = await parser.build_message(headers, data)
+    if message is None:
+        raise ValueError("The message was dropped")
+    return len(fm_message.dumps(message))
+
+
+async def main() -> None:
+    print(f"{'payload':<10} {'commits':>8} {'full':>10} {'headers':>16} {'headers+pruning':>16}")
+    for kind in KINDS:
+        for commits in SIZES:
+            data = load_data(kind, commits)
+            full = await message_size(kind, data, ["*"], prune=False)
+            headers = await message_size(kind, data, None, prune=False)
+            pruned = await message_size(kind, data, None, prune=True)
+            print(
+                f"{kind:<10} {commits:>8} {full:>10} "
+                f"{headers:>10} ({(full - headers) / full:>3.0%}) "
+                f"{pruned:>10} ({(full - pruned) / full:>3.0%})"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
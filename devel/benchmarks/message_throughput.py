@@ -0,0 +1,177 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Compare the throughput of the message endpoint with the session and CORS middleware applied to
+all the routes, and with the webhooks skipping them.
+
+The application is called directly as an ASGI app, without an HTTP server. The service lookup,
+the agent lookup and publishing are replaced with stubs. The middleware stacks are also measured
+around an endpoint that does nothing, since their cost is small next to the endpoint's.
+
+Usage: python devel/benchmarks/message_throughput.py
+"""
+
+import asyncio
+import hashlib
+import hmac
+import time
+import uuid
+from typing import Any
+from unittest import mock
+
+from fastapi import FastAPI
+from payloads import load_data, load_headers
+from starlette.middleware import Middleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from webhook_to_fedora_messaging.endpoints.util import service_snapshot_from_uuid
+from webhook_to_fedora_messaging.main import create_app
+from webhook_to_fedora_messaging.middleware import SkipPathsMiddleware
+from webhook_to_fedora_messaging.service_cache import ServiceSnapshot
+
+
+REQUESTS = 5000
+REPEAT = 5
+TOKEN = "dummy-token"  # noqa: S105
+SERVICE = ServiceSnapshot(
+    id=1,
+    uuid="dummy-uuid",
+    name="Dummy service",
+    type="github",
+    token=TOKEN,
+    disabled=False,
+    max_body_size=None,
+    allowed_events=None,
+    denied_events=None,
+    routing_rules=None,
+    pruning_profiles=None,
+)
+
+
+def app_before() -> FastAPI:
+    # The previous implementation: the middleware apply to all the routes
+    app = app_after()
+    app.user_middleware = [
+        (
+            Middleware(
+                middleware.kwargs["middleware"],
+                **{
+                    k: v
+                    for k, v in middleware.kwargs.items()
+                    if k not in ("middleware", "skip_paths")
+                },
+            )
+            if middleware.cls is SkipPathsMiddleware
+            else middleware
+        )
+        for middleware in app.user_middleware
+    ]
+    return app
+
+
+def app_after() -> FastAPI:
+    app = create_app()
+    app.dependency_overrides[service_snapshot_from_uuid] = lambda: SERVICE
+    return app
+
+
+async def call(app: ASGIApp, data: bytes, headers: list[tuple[bytes, bytes]]) -> int:
+    scope: dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "https",
+        "path": f"/api/v1/messages/{SERVICE.uuid}",
+        "raw_path": f"/api/v1/messages/{SERVICE.uuid}".encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [*headers, (b"x-github-delivery", str(uuid.uuid4()).encode())],
+        "client": ("140.82.115.10", 443),
+        "server": ("webhook.fedoraproject.org", 443),
+    }
+    status = 0
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": data, "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def stub_endpoint(scope: Scope, receive: Receive, send: Send) -> None:
+    await send({"type": "http.response.start", "status": 202, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def middleware_only(app: FastAPI) -> ASGIApp:
+    stack: ASGIApp = stub_endpoint
+    for cls, args, kwargs in reversed(app.user_middleware):
+        stack = cls(stack, *args, **kwargs)
+    return stack
+
+
+async def run(
+    app: ASGIApp, data: bytes, headers: list[tuple[bytes, bytes]], requests: int = REQUESTS
+) -> float:
+    start = time.perf_counter()
+    for _i in range(requests):
+        status = await call(app, data, headers)
+        if status != 202:
+            raise ValueError(f"Unexpected status: {status}")
+    return requests / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    data = load_data("github", 1)
+    signature = hmac.new(TOKEN.encode(), data, hashlib.sha256).hexdigest()
+    headers = {
+        **load_headers("github"),
+        "x-hub-signature-256": f"sha256={signature}",
+        "content-type": "application/json",
+        "content-length": str(len(data)),
+        "user-agent": "GitHub-Hookshot/7b9ae7d",
+    }
+    headers.pop("x-github-delivery", None)
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+    with (
+        mock.patch("webhook_to_fedora_messaging.endpoints.message.publish"),
+        mock.patch(
+            "webhook_to_fedora_messaging.endpoints.parser.github.GitHubParser.get_agent",
+            return_value="dummy-fas-username",
+        ),
+    ):
+        print(f"{REQUESTS} requests of {len(data)} bytes, best of {REPEAT}")
+        apps = {"before": app_before(), "after": app_after()}
+        stacks = {name: middleware_only(app) for name, app in apps.items()}
+        results = dict.fromkeys(apps, 0.0)
+        stack_results = dict.fromkeys(apps, 0.0)
+        # Alternate the runs, the machine's load changes over time
+        for _i in range(REPEAT):
+            for name in apps:
+                results[name] = max(results[name], await run(apps[name], data, raw_headers))
+                stack_results[name] = max(
+                    stack_results[name],
+                    await run(stacks[name], data, raw_headers, requests=REQUESTS * 20),
+                )
+        print(f"{'':>7} {'endpoint':>14} {'middleware only':>16}")
+        for name in apps:
+            print(
+                f"{name:>7} {results[name]:>8.0f} req/s {stack_results[name]:>10.0f} req/s "
+                f"({1e6 / stack_results[name]:.1f} µs)"
+            )
+        print(
+            f"{'gain':>7} {results['after'] / results['before'] - 1:>12.1%} "
+            f"{stack_results['after'] / stack_results['before'] - 1:>14.1%}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Webhook payloads of various sizes for the benchmarks, built from the test fixtures.
+"""
+
+import copy
+import json
+from pathlib import Path
+from typing import Any
+
+
+FIXTURES_DIR = Path(__file__).parent.parent.parent.joinpath("tests", "test_message", "fixtures")
+KINDS = ("github", "forgejo")
+# Number of commits in the push event
+SIZES = (1, 100, 1000, 5000)
+
+
+def load_payload(kind: str, commits: int) -> dict[str, Any]:
+    with open(FIXTURES_DIR.joinpath(f"payload_{kind}.json")) as fh:
+        payload: dict[str, Any] = json.load(fh)
+    commit = payload["commits"][0]
+    payload["commits"] = [copy.deepcopy(commit) for _ in range(commits)]
+    return payload
+
+
+def load_headers(kind: str) -> dict[str, str]:
+    with open(FIXTURES_DIR.joinpath(f"headers_{kind}.json")) as fh:
+        headers: dict[str, str] = json.load(fh)
+    return headers
+
+
+def load_data(kind: str, commits: int) -> bytes:
+    return json.dumps(load_payload(kind, commits)).encode("utf-8")
@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""
+Compare the CPU time spent on each message when publishing it, with the payload encoded again
+and with the payload passed through as it was received.
+
+This is what fedora_messaging does with the message when it is published: validate it, and
+encode its body. The payloads are not pruned.
+
+Usage: python devel/benchmarks/publish_cpu.py
+"""
+
+import asyncio
+import time
+import timeit
+from functools import partial
+from unittest import mock
+
+from fedora_messaging.api import Message
+from payloads import KINDS, load_data, load_headers, SIZES
+
+from webhook_to_fedora_messaging.config import get_config
+from webhook_to_fedora_messaging.endpoints.parser import PARSERS
+from webhook_to_fedora_messaging.pruning import NO_PRUNING
+
+
+async def build_message(kind: str, data: bytes, passthrough: bool) -> Message:
+    parser_class = PARSERS[kind]
+    parser = parser_class("", mock.Mock(), pruning_profiles=NO_PRUNING)
+    with (
+        mock.patch.object(parser_class, "get_agent", return_value="dummy-fas-username"),
+        mock.patch.object(get_config().webhooks, "raw_body_passthrough", passthrough),
+    ):
+        message = await parser.build_message(load_headers(kind), data)
+    if message is None:
+        raise ValueError("The message was dropped")
+    return message
+
+
+def publish_path(message: Message) -> bytes:
+    # fedora_messaging.twisted.protocol.FedoraMessagingProtocolV2.publish()
+    message.validate()
+    return message._encoded_body
+
+
+async def main() -> None:
+    print(f"{'payload':<10} {'commits':>8} {'size':>10} {'before':>10} {'after':>10} {'saved':>6}")
+    for kind in KINDS:
+        for commits in SIZES:
+            data = load_data(kind, commits)
+            number = max(1, 2000 // commits)
+            results = {}
+            for name, passthrough in (("before", False), ("after", True)):
+                message = await build_message(kind, data, passthrough)
+                timer = timeit.Timer(partial(publish_path, message), timer=time.process_time)
+                results[name] = min(timer.repeat(repeat=5, number=number)) / number
+            saved = 1 - results["after"] / results["before"]
+            print(
+                f"{kind:<10} {commits:>8} {len(data):>10} {results['before'] * 1e3:>8.3f}ms "
+                f"{results['after'] * 1e3:>8.3f}ms {saved:>6.0%}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
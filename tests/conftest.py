@@ -13,10 +13,15 @@ from sqlalchemy_helpers.aio import AsyncDatabaseManager
 
 from webhook_to_fedora_messaging import database
 from webhook_to_fedora_messaging.config import set_config_file
+from webhook_to_fedora_messaging.counters import get_service_counters
 from webhook_to_fedora_messaging.database import get_db_manager
+from webhook_to_fedora_messaging.deliveries import get_delivery_store, get_duplicate_store
+from webhook_to_fedora_messaging.endpoints.message import get_message_responses
+from webhook_to_fedora_messaging.identities import get_identity_index
 from webhook_to_fedora_messaging.main import create_app
 from webhook_to_fedora_messaging.models.service import Service
 from webhook_to_fedora_messaging.models.user import User
+from webhook_to_fedora_messaging.service_cache import get_service_cache
 
 
 @pytest.fixture()
@@ -43,6 +48,12 @@ async def db(app_config: None) -> AsyncGenerator[AsyncDatabaseManager, None]:
     from webhook_to_fedora_messaging import models  # noqa: F401
 
     get_db_manager.cache_clear()
+    get_service_cache.cache_clear()
+    get_service_counters.cache_clear()
+    get_identity_index.cache_clear()
+    get_delivery_store.cache_clear()
+    get_duplicate_store.cache_clear()
+    get_message_responses.cache_clear()
     db_mgr = get_db_manager()
     await db_mgr.sync()
     yield db_mgr
@@ -107,6 +118,16 @@ async def authenticated(db_user: User, client: AsyncClient) -> AsyncGenerator[mo
         yield oauth
 
 
+@pytest.fixture()
+async def admin(db_user: User, db_session: AsyncSession, authenticated: mock.MagicMock) -> User:
+    """
+    For making the connected user an administrator
+    """
+    db_user.is_admin = True
+    await db_session.commit()
+    return db_user
+
+
 @pytest.fixture()
 async def db_service(
     client: AsyncClient, db_user: User, db_session: AsyncSession, request: pytest.FixtureRequest
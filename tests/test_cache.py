@@ -0,0 +1,165 @@
+import asyncio
+from functools import partial
+from typing import Any
+from unittest import mock
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy_helpers.aio import AsyncDatabaseManager
+
+from webhook_to_fedora_messaging import service_cache as service_cache_module
+from webhook_to_fedora_messaging.cache import LRUCache, SingleFlight
+from webhook_to_fedora_messaging.models.service import Service
+from webhook_to_fedora_messaging.service_cache import ServiceCache, ServiceSnapshot
+
+
+def test_lru_cache() -> None:
+    """
+    Evicting the least recently used entries
+    """
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    cache.delete("a")
+    assert cache.get("a", "default") == "default"
+
+
+def test_lru_cache_expiry() -> None:
+    """
+    Expiring entries
+    """
+    cache: LRUCache[str, int] = LRUCache(maxsize=2, ttl=60)
+    with mock.patch("webhook_to_fedora_messaging.cache.time.monotonic", return_value=100):
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=10)
+    with mock.patch("webhook_to_fedora_messaging.cache.time.monotonic", return_value=120):
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert len(cache) == 1
+
+
+async def test_single_flight() -> None:
+    """
+    Merging concurrent calls for the same key
+    """
+    calls = []
+
+    async def _call(key: str) -> str:
+        calls.append(key)
+        await asyncio.sleep(0.1)
+        return key.upper()
+
+    single_flight: SingleFlight[str, str] = SingleFlight()
+    results = await asyncio.gather(
+        *[single_flight.do(key, partial(_call, key)) for key in ("a", "a", "b", "a")]
+    )
+    assert results == ["A", "A", "B", "A"]
+    assert sorted(calls) == ["a", "b"]
+    assert "a" not in single_flight
+    # It is called again once the first call is over
+    assert await single_flight.do("a", lambda: _call("a")) == "A"
+    assert len(calls) == 3
+
+
+async def test_single_flight_error() -> None:
+    """
+    Sharing the error of a call
+    """
+
+    async def _call() -> str:
+        await asyncio.sleep(0.1)
+        raise ValueError("dummy")
+
+    single_flight: SingleFlight[str, str] = SingleFlight()
+    results = await asyncio.gather(
+        single_flight.do("a", _call), single_flight.do("a", _call), return_exceptions=True
+    )
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+async def test_single_flight_cancel() -> None:
+    """
+    Canceling the first caller does not cancel the call for the others
+    """
+
+    async def _call() -> str:
+        await asyncio.sleep(0.1)
+        return "result"
+
+    single_flight: SingleFlight[str, str] = SingleFlight()
+    first = asyncio.create_task(single_flight.do("a", _call))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(single_flight.do("a", _call))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "result"
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_service_cache(db: AsyncDatabaseManager, db_service: Service) -> None:
+    """
+    Caching service snapshots
+    """
+    service_cache = ServiceCache(maxsize=10, ttl=60)
+    with mock.patch(
+        "webhook_to_fedora_messaging.service_cache.load_service_snapshot",
+        wraps=service_cache_module.load_service_snapshot,
+    ) as load:
+        snapshots = await asyncio.gather(*[service_cache.get(db_service.uuid) for _ in range(5)])
+        # Concurrent lookups share the same query
+        load.assert_called_once_with(db_service.uuid)
+        assert snapshots[0] == ServiceSnapshot(
+            id=db_service.id,
+            uuid=db_service.uuid,
+            name=db_service.name,
+            type=db_service.type,
+            token=db_service.token,
+            disabled=False,
+            max_body_size=None,
+            allowed_events=None,
+            denied_events=None,
+            routing_rules=None,
+            pruning_profiles=None,
+        )
+        assert all(snapshot is snapshots[0] for snapshot in snapshots)
+        # The snapshot is cached
+        await service_cache.get(db_service.uuid)
+        assert load.call_count == 1
+        # Until it is invalidated
+        service_cache.invalidate(db_service.uuid)
+        await service_cache.get(db_service.uuid)
+        assert load.call_count == 2
+        # Unknown services are not cached
+        assert await service_cache.get("non-existent") is None
+        assert await service_cache.get("non-existent") is None
+        assert load.call_count == 4
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_load_service_snapshot_readonly(
+    db: AsyncDatabaseManager, db_service: Service
+) -> None:
+    """
+    Loading a service snapshot with a single query and no transaction
+    """
+    statements = []
+
+    def _before_cursor_execute(*args: Any) -> None:
+        statements.append(args[2])
+
+    engine = db.engine.sync_engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    with mock.patch.object(engine.dialect, "do_commit") as do_commit:
+        snapshot = await service_cache_module.load_service_snapshot(db_service.uuid)
+    event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+    assert snapshot is not None
+    assert snapshot.token == db_service.token
+    assert len(statements) == 1
+    assert statements[0].startswith("SELECT")
+    do_commit.assert_not_called()
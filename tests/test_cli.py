@@ -1,9 +1,12 @@
 import asyncio
+from pathlib import Path
+from unittest import mock
 
 from click.testing import CliRunner
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from webhook_to_fedora_messaging import cli, database, models
+from webhook_to_fedora_messaging.identities import get_fas_username, IdentitiesSyncResult
 
 
 def test_cli_create(db_session: AsyncSession) -> None:
@@ -29,3 +32,36 @@ def test_cli_create(db_session: AsyncSession) -> None:
         assert users[0].id == user.id
 
     asyncio.run(_check())
+
+
+def test_cli_sync_identities(db_session: AsyncSession) -> None:
+    """
+    Synchronizing the GitHub identities using CLI
+    """
+    runner = CliRunner()
+    with mock.patch.object(
+        cli,
+        "sync_github_identities",
+        return_value=IdentitiesSyncResult(added=3, updated=2, removed=1),
+    ) as sync_github_identities:
+        result = runner.invoke(cli.sync_github, ["--page-size", "10"])
+    assert result.exit_code == 0, result.output
+    assert sync_github_identities.call_args.kwargs == {"page_size": 10}
+    assert result.output == ("GitHub identities: 3 added, 2 updated, 1 removed, 0 conflicting\n")
+
+
+def test_cli_import_identities(db_session: AsyncSession, tmp_path: Path) -> None:
+    """
+    Importing the Forgejo identities from a file using CLI
+    """
+    path = tmp_path / "identities.yaml"
+    path.write_text("Dummy-Login: dummy-fas\nother-login: other-fas\n")
+    runner = CliRunner()
+    result = runner.invoke(cli.import_identities, ["forgejo", path.as_posix()])
+    assert result.exit_code == 0, result.output
+    assert result.output == "forgejo identities: 2 added, 0 updated, 0 removed\n"
+
+    async def _check() -> None:
+        assert await get_fas_username("forgejo", "dummy-login") == "dummy-fas"
+
+    asyncio.run(_check())
@@ -0,0 +1,64 @@
+from unittest import mock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from webhook_to_fedora_messaging.counters import ServiceCounters
+from webhook_to_fedora_messaging.models.service import Service
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_counters_flush(db_session: AsyncSession, db_service: Service) -> None:
+    """
+    Writing the services counters to the database
+    """
+    counters = ServiceCounters(flush_interval=10)
+    for _ in range(3):
+        counters.increment(db_service.id)
+    assert counters.pending(db_service.id)["sent"] == 3
+    await counters.flush()
+    assert counters.pending(db_service.id)["sent"] == 0
+    await db_session.refresh(db_service)
+    assert db_service.sent == 3
+    assert db_service.last_sent_at is not None
+    # The counts add up
+    counters.increment(db_service.id)
+    await counters.flush()
+    await db_session.refresh(db_service)
+    assert db_service.sent == 4
+    # Nothing to write
+    await counters.flush()
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_counters_flush_failure(db_session: AsyncSession, db_service: Service) -> None:
+    """
+    Keeping the counts that could not be written
+    """
+    counters = ServiceCounters(flush_interval=10)
+    counters.increment(db_service.id)
+    with (
+        mock.patch(
+            "webhook_to_fedora_messaging.counters.with_db_session", side_effect=RuntimeError
+        ),
+        pytest.raises(RuntimeError),
+    ):
+        await counters.flush()
+    counters.increment(db_service.id)
+    assert counters.pending(db_service.id)["sent"] == 2
+    await counters.flush()
+    await db_session.refresh(db_service)
+    assert db_service.sent == 2
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_counters_stop(db_session: AsyncSession, db_service: Service) -> None:
+    """
+    Writing the last counts on shutdown
+    """
+    counters = ServiceCounters(flush_interval=10)
+    await counters.start()
+    counters.increment(db_service.id)
+    await counters.stop()
+    await db_session.refresh(db_service)
+    assert db_service.sent == 1
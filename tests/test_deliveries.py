@@ -0,0 +1,36 @@
+from unittest import mock
+
+import pytest
+from cashews import cache
+
+from webhook_to_fedora_messaging.cache import configure_cache
+from webhook_to_fedora_messaging.deliveries import DeliveryStore
+
+
+async def test_deliveries_shared(app_config: None) -> None:
+    """
+    Answering the redeliveries handled by another worker
+    """
+    configure_cache()
+    first_worker = DeliveryStore(maxsize=10, ttl=60, shared=True)
+    second_worker = DeliveryStore(maxsize=10, ttl=60, shared=True)
+    send = mock.AsyncMock(return_value="dummy-message-id")
+    assert await first_worker.send_once("dummy-uuid", "dummy-delivery", send) == "dummy-message-id"
+    assert await second_worker.send_once("dummy-uuid", "dummy-delivery", send) == "dummy-message-id"
+    send.assert_awaited_once_with()
+    # The deliveries are kept for each service
+    assert await second_worker.send_once("other-uuid", "dummy-delivery", send) == "dummy-message-id"
+    assert send.await_count == 2
+    await cache.clear()
+
+
+async def test_deliveries_failure() -> None:
+    """
+    Sending the delivery again when it failed
+    """
+    deliveries = DeliveryStore(maxsize=10, ttl=60)
+    send = mock.AsyncMock(side_effect=[ValueError("Failed"), "dummy-message-id"])
+    with pytest.raises(ValueError):
+        await deliveries.send_once("dummy-uuid", "dummy-delivery", send)
+    assert await deliveries.send_once("dummy-uuid", "dummy-delivery", send) == "dummy-message-id"
+    assert send.await_count == 2
@@ -0,0 +1,341 @@
+import asyncio
+import time
+from collections import Counter
+from collections.abc import AsyncGenerator
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+import httpx
+import pytest
+from cashews import cache
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy_helpers.aio import AsyncDatabaseManager
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from webhook_to_fedora_messaging.cache import configure_cache
+from webhook_to_fedora_messaging.config import get_config
+from webhook_to_fedora_messaging.fasjson import (
+    FASJSONAsyncProxy,
+    get_fasjson,
+    SEARCH_TTL,
+    SessionSPNEGOAuth,
+)
+from webhook_to_fedora_messaging.identities import (
+    get_fas_username,
+    get_identity_index,
+    IdentitiesSyncResult,
+    sync_github_identities,
+)
+
+
+class StubFASJSON:
+    """
+    A local FASJSON server that counts the requests it receives
+    """
+
+    def __init__(self, delay: float = 0.05) -> None:
+        self.delay = delay
+        self.requests: Counter[str] = Counter()
+        self.users = {"dummy-login": "dummy-fas-username"}
+        self.timeouts: set[str] = set()
+        self.failing = False
+        self.app = Starlette(
+            routes=[
+                Route("/v1/search/users/", self.search_users),
+                Route("/v1/users/", self.list_users),
+            ]
+        )
+
+    async def search_users(self, request: Request) -> JSONResponse:
+        github_username = request.query_params["github_username"]
+        self.requests[github_username] += 1
+        # Slow enough for the lookups to overlap
+        await asyncio.sleep(self.delay)
+        if github_username in self.timeouts:
+            raise httpx.ReadTimeout("Stub timeout")
+        if self.failing:
+            return JSONResponse({"message": "Stub failure"}, status_code=500)
+        result = []
+        if github_username in self.users:
+            result.append({"username": self.users[github_username]})
+        return JSONResponse({"result": result})
+
+    async def list_users(self, request: Request) -> JSONResponse:
+        self.requests["/users/"] += 1
+        fields = request.headers["X-Fields"].strip("{}").split(",")
+        users = [
+            {"username": username, "github_username": github_username, "ircnick": None}
+            for github_username, username in self.users.items()
+        ]
+        page_size = int(request.query_params["page_size"])
+        page_number = int(request.query_params["page_number"])
+        page = users[(page_number - 1) * page_size : page_number * page_size]
+        return JSONResponse(
+            {
+                "result": [{field: user[field] for field in fields} for user in page],
+                "page": {"page_number": page_number, "total_pages": -(-len(users) // page_size)},
+            }
+        )
+
+
+@pytest.fixture()
+def stub_fasjson() -> StubFASJSON:
+    return StubFASJSON()
+
+
+def _stub_proxy(stub_fasjson: StubFASJSON, **kwargs: Any) -> FASJSONAsyncProxy:
+    proxy = FASJSONAsyncProxy("http://fasjson.example.com", **kwargs)
+    proxy.client = AsyncClient(
+        base_url=proxy.api_url, transport=ASGITransport(app=stub_fasjson.app)
+    )
+    return proxy
+
+
+@pytest.fixture()
+async def fasjson(
+    db: AsyncDatabaseManager, stub_fasjson: StubFASJSON
+) -> AsyncGenerator[FASJSONAsyncProxy, None]:
+    configure_cache()
+    proxy = _stub_proxy(stub_fasjson)
+    yield proxy
+    await proxy.close()
+    await cache.clear()
+
+
+async def test_search_users_miss_storm(
+    fasjson: FASJSONAsyncProxy, stub_fasjson: StubFASJSON
+) -> None:
+    """
+    Looking up the same users many times at once with a cold cache
+    """
+    logins = ["dummy-login", "unknown-login"] * 25
+    results = await asyncio.gather(*[fasjson.get_username_from_github(login) for login in logins])
+    assert results == ["dummy-fas-username", None] * 25
+    # A single upstream request for each user
+    assert stub_fasjson.requests == {"dummy-login": 1, "unknown-login": 1}
+    # The next lookups are served from the cache
+    await fasjson.get_username_from_github("dummy-login")
+    assert stub_fasjson.requests == {"dummy-login": 1, "unknown-login": 1}
+
+
+async def test_search_users_timeout(fasjson: FASJSONAsyncProxy, stub_fasjson: StubFASJSON) -> None:
+    """
+    Remembering for a short while that looking up a user timed out
+    """
+    stub_fasjson.timeouts.add("dummy-login")
+    assert await fasjson.get_username_from_github("dummy-login") is None
+    assert await fasjson.get_username_from_github("dummy-login") is None
+    assert stub_fasjson.requests == {"dummy-login": 1}
+
+
+async def test_search_users_stale(fasjson: FASJSONAsyncProxy, stub_fasjson: StubFASJSON) -> None:
+    """
+    Using the stale search results while they are refreshed
+    """
+    assert await fasjson.get_username_from_github("dummy-login") == "dummy-fas-username"
+    stub_fasjson.users["dummy-login"] = "renamed-fas-username"
+    with mock.patch("time.time", return_value=time.time() + SEARCH_TTL[0] + 1):
+        results = await asyncio.gather(
+            *[fasjson.get_username_from_github("dummy-login") for _i in range(10)]
+        )
+        assert results == ["dummy-fas-username"] * 10
+        # A single refresh, in the background
+        await asyncio.sleep(stub_fasjson.delay * 4)
+        assert await fasjson.get_username_from_github("dummy-login") == "renamed-fas-username"
+    assert stub_fasjson.requests == {"dummy-login": 2}
+
+
+async def test_search_users_stale_refresh_failure(
+    fasjson: FASJSONAsyncProxy, stub_fasjson: StubFASJSON
+) -> None:
+    """
+    Keeping the stale search results when they can't be refreshed
+    """
+    assert await fasjson.get_username_from_github("dummy-login") == "dummy-fas-username"
+    stub_fasjson.failing = True
+    with mock.patch("time.time", return_value=time.time() + SEARCH_TTL[0] + 1):
+        for _i in range(2):
+            assert await fasjson.get_username_from_github("dummy-login") == "dummy-fas-username"
+            await asyncio.sleep(stub_fasjson.delay * 4)
+    # Still stale, so it was tried again
+    assert stub_fasjson.requests == {"dummy-login": 3}
+
+
+async def test_search_users_disk_cache(
+    fasjson: FASJSONAsyncProxy, stub_fasjson: StubFASJSON, tmp_path: Path
+) -> None:
+    """
+    Keeping the search results across restarts
+    """
+    stub_fasjson.timeouts.add("slow-login")
+    logins = ["dummy-login", "unknown-login", "slow-login"]
+    cache_path = tmp_path.joinpath("fasjson.sqlite")
+    first = _stub_proxy(stub_fasjson, cache_path=cache_path)
+    assert [await first.get_username_from_github(login) for login in logins] == [
+        "dummy-fas-username",
+        None,
+        None,
+    ]
+    assert first.cache.stats["memory"].hits == 0
+    assert first.cache.stats["disk"].misses == 3
+    await first.close()
+
+    # Another worker, or the same one after a restart
+    second = _stub_proxy(stub_fasjson, cache_path=cache_path)
+    for _i in range(2):
+        assert [await second.get_username_from_github(login) for login in logins] == [
+            "dummy-fas-username",
+            None,
+            None,
+        ]
+    assert stub_fasjson.requests == {"dummy-login": 1, "unknown-login": 1, "slow-login": 1}
+    assert second.cache.stats["disk"].hits == 3
+    assert second.cache.stats["disk"].misses == 0
+    assert second.cache.stats["memory"].hits == 3
+    assert second.cache.stats["memory"].hit_ratio == 0.5
+    await second.close()
+
+
+async def test_search_users_shared_cache(
+    fasjson: FASJSONAsyncProxy, stub_fasjson: StubFASJSON, tmp_path: Path
+) -> None:
+    """
+    Sharing the search results with the other hosts through the cashews cache
+    """
+    first = _stub_proxy(
+        stub_fasjson, cache_path=tmp_path.joinpath("first.sqlite"), cache_shared=True
+    )
+    assert await first.get_username_from_github("dummy-login") == "dummy-fas-username"
+    assert first.cache.stats["shared"].misses == 1
+    await first.close()
+
+    # A worker on another host
+    second = _stub_proxy(
+        stub_fasjson, cache_path=tmp_path.joinpath("second.sqlite"), cache_shared=True
+    )
+    for _i in range(2):
+        assert await second.get_username_from_github("dummy-login") == "dummy-fas-username"
+    assert stub_fasjson.requests == {"dummy-login": 1}
+    assert second.cache.stats["disk"].misses == 1
+    assert second.cache.stats["shared"].hits == 1
+    assert second.cache.stats["memory"].hits == 1
+    await second.close()
+
+    # The result was copied to the host's file
+    third = _stub_proxy(stub_fasjson, cache_path=tmp_path.joinpath("second.sqlite"))
+    assert await third.get_username_from_github("dummy-login") == "dummy-fas-username"
+    assert third.cache.stats["disk"].hits == 1
+    assert stub_fasjson.requests == {"dummy-login": 1}
+    await third.close()
+
+
+@pytest.mark.parametrize(
+    "cache_url, cache_shared, expected",
+    [
+        ("mem://", None, False),
+        ("redis://localhost/0", None, True),
+        ("redis://localhost/0", False, False),
+        ("mem://", True, True),
+    ],
+)
+def test_search_users_shared_cache_config(
+    app_config: None, cache_url: str, cache_shared: bool | None, expected: bool
+) -> None:
+    """
+    Using the cashews cache for the search results by default when it is not in memory
+    """
+    get_fasjson.cache_clear()
+    with (
+        mock.patch.object(get_config().cache, "url", cache_url),
+        mock.patch.object(get_config().fasjson, "cache_shared", cache_shared),
+    ):
+        assert get_fasjson().cache.shared is expected
+    get_fasjson.cache_clear()
+
+
+async def test_circuit_breaker(fasjson: FASJSONAsyncProxy, stub_fasjson: StubFASJSON) -> None:
+    """
+    Not querying FASJSON while it is failing
+    """
+    stub_fasjson.failing = True
+    for index in range(10):
+        assert await fasjson.get_username_from_github(f"login-{index}") is None
+    # The breaker opened after the minimum number of failed calls
+    assert sum(stub_fasjson.requests.values()) == 5
+
+
+async def test_sync_github_identities(
+    fasjson: FASJSONAsyncProxy, stub_fasjson: StubFASJSON
+) -> None:
+    """
+    Storing the GitHub usernames of the FAS users locally
+    """
+    stub_fasjson.users = {
+        "Dummy-Login": "dummy-fas-username",
+        "other-login": "other-fas-username",
+        "renamed-login": "renamed-fas-username",
+    }
+    result = await sync_github_identities(fasjson, page_size=2)
+    assert result == IdentitiesSyncResult(added=3, updated=0, removed=0)
+    assert stub_fasjson.requests == {"/users/": 2}
+    # The sender is found without searching FASJSON
+    assert await fasjson.get_username_from_github("dummy-login") == "dummy-fas-username"
+    assert stub_fasjson.requests == {"/users/": 2}
+
+    stub_fasjson.users = {
+        "dummy-login": "dummy-fas-username",
+        "other-login": "changed-fas-username",
+        "new-login": "new-fas-username",
+        "NEW-LOGIN": "impostor-fas-username",
+    }
+    result = await sync_github_identities(fasjson, page_size=2)
+    assert result == IdentitiesSyncResult(added=0, updated=1, removed=1, conflicts=1)
+    await get_identity_index("github").refresh()
+    assert await get_fas_username("github", "other-login") == "changed-fas-username"
+    assert await get_fas_username("github", "renamed-login") is None
+    assert await get_fas_username("github", "new-login") is None
+
+
+async def test_client_config(app_config: None) -> None:
+    """
+    Configuring the HTTP client
+    """
+    get_fasjson.cache_clear()
+    with mock.patch.object(get_config().fasjson.client, "timeout", 2.0):
+        fasjson = get_fasjson()
+    assert fasjson.client.timeout == httpx.Timeout(2.0, connect=5.0)
+    await fasjson.close()
+    assert fasjson.client.is_closed
+    get_fasjson.cache_clear()
+
+
+@pytest.mark.parametrize("cookie,negotiated", [(None, True), ("session=dummy", False)])
+def test_session_spnego_auth(cookie: str | None, negotiated: bool) -> None:
+    """
+    Negotiating upfront, unless the server gave a session cookie
+    """
+    auth = SessionSPNEGOAuth()
+    request = httpx.Request(
+        "GET",
+        "http://fasjson.example.com/v1/search/users/",
+        headers={"Cookie": cookie} if cookie else {},
+    )
+    with (
+        mock.patch.object(SessionSPNEGOAuth, "set_auth_header", create=True) as set_auth_header,
+        mock.patch.object(
+            SessionSPNEGOAuth, "handle_response", create=True, return_value=iter(())
+        ) as handle_response,
+    ):
+        flow = auth.auth_flow(request)
+        assert next(flow) is request
+        response = httpx.Response(200)
+        with pytest.raises(StopIteration):
+            flow.send(response)
+    assert set_auth_header.called is negotiated
+    handle_response.assert_called_once_with(
+        response, set_auth_header.return_value if negotiated else None
+    )
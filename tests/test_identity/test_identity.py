@@ -0,0 +1,100 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from webhook_to_fedora_messaging.identities import get_fas_username, IdentityIndex
+from webhook_to_fedora_messaging.models import ForgeIdentity, User
+
+
+async def test_identity_set(client: AsyncClient, admin: User, db_session: AsyncSession) -> None:
+    """
+    Setting the FAS username of a Forgejo user
+    """
+    # The index is loaded before the change
+    assert await get_fas_username("forgejo", "dummy-login") is None
+    response = await client.put(
+        "/api/v1/identities/forgejo/Dummy-Login", json={"data": {"fas_username": "dummy-fas"}}
+    )
+    assert response.status_code == 202, response.text
+    assert response.json()["data"]["forge_username"] == "dummy-login"
+    assert response.json()["data"]["fas_username"] == "dummy-fas"
+    assert await get_fas_username("forgejo", "dummy-login") == "dummy-fas"
+
+    response = await client.put(
+        "/api/v1/identities/forgejo/dummy-login", json={"data": {"fas_username": "other-fas"}}
+    )
+    assert response.status_code == 202, response.text
+    assert await get_fas_username("forgejo", "dummy-login") == "other-fas"
+    response = await client.get("/api/v1/identities/forgejo/dummy-login")
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["fas_username"] == "other-fas"
+
+
+async def test_identity_delete(client: AsyncClient, admin: User, db_session: AsyncSession) -> None:
+    """
+    Forgetting the FAS username of a Forgejo user
+    """
+    db_session.add(
+        ForgeIdentity(forge="forgejo", forge_username="dummy-login", fas_username="dummy-fas")
+    )
+    await db_session.commit()
+    assert await get_fas_username("forgejo", "dummy-login") == "dummy-fas"
+    response = await client.delete("/api/v1/identities/forgejo/dummy-login")
+    assert response.status_code == 204, response.text
+    assert await get_fas_username("forgejo", "dummy-login") is None
+    response = await client.delete("/api/v1/identities/forgejo/dummy-login")
+    assert response.status_code == 404, response.text
+
+
+async def test_identity_not_admin(client: AsyncClient, authenticated: mock.MagicMock) -> None:
+    """
+    Setting the FAS username of a Forgejo user without being an administrator
+    """
+    response = await client.put(
+        "/api/v1/identities/forgejo/dummy-login", json={"data": {"fas_username": "dummy-fas"}}
+    )
+    assert response.status_code == 403, response.text
+
+
+async def test_identity_index_reload(db_session: AsyncSession) -> None:
+    """
+    Noticing the identities changed by another worker
+    """
+    index = IdentityIndex("forgejo", reload_interval=0)
+    assert await index.get_username("dummy-login") is None
+    db_session.add(
+        ForgeIdentity(forge="forgejo", forge_username="dummy-login", fas_username="dummy-fas")
+    )
+    await db_session.commit()
+    # The change is loaded in the background
+    assert await index.get_username("dummy-login") is None
+    assert index._background_refresh is not None
+    await index._background_refresh
+    assert await index.get_username("dummy-login") == "dummy-fas"
+
+
+async def test_identity_index_reload_failure(
+    db_session: AsyncSession, caplog: pytest.LogCaptureFixture
+) -> None:
+    """
+    Logging the errors of the background reloads, and keeping the loaded identities
+    """
+    db_session.add(
+        ForgeIdentity(forge="forgejo", forge_username="dummy-login", fas_username="dummy-fas")
+    )
+    await db_session.commit()
+    index = IdentityIndex("forgejo", reload_interval=0)
+    assert await index.get_username("dummy-login") == "dummy-fas"
+    with mock.patch(
+        "webhook_to_fedora_messaging.identities.with_db_session",
+        side_effect=ValueError("dummy database error"),
+    ):
+        assert await index.get_username("dummy-login") == "dummy-fas"
+        assert index._background_refresh is not None
+        await asyncio.wait([index._background_refresh])
+    assert "Could not refresh the forgejo identities in the background" in caplog.text
+    assert "dummy database error" in caplog.text
+    assert await index.get_username("dummy-login") == "dummy-fas"
@@ -1,21 +1,41 @@
+import asyncio
+import codecs
 import hashlib
 import hmac
 import json
 import pathlib
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
+from functools import partial
 from unittest import mock
 
 import pytest
+from fastapi.encoders import jsonable_encoder
 from fedora_messaging.api import Message
 from fedora_messaging.exceptions import ConnectionException
+from fedora_messaging.message import get_name
 from httpx import AsyncClient
 from pytest import FixtureRequest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy_helpers.aio import AsyncDatabaseManager
 from twisted.internet import defer
 from twisted.internet.defer import Deferred
 from webhook_to_fedora_messaging_messages.forgejo import ForgejoMessageV1
 from webhook_to_fedora_messaging_messages.github import GitHubMessageV1
 
+from webhook_to_fedora_messaging.config import get_config
+from webhook_to_fedora_messaging.counters import get_service_counters
+from webhook_to_fedora_messaging.deliveries import DeliveryStore
+from webhook_to_fedora_messaging.endpoints.message import (
+    _send_unique_payload,
+    get_message_responses,
+)
+from webhook_to_fedora_messaging.endpoints.models.message import MessageResult
+from webhook_to_fedora_messaging.endpoints.parser.base import _background_lookups, RawBodyMessage
+from webhook_to_fedora_messaging.models.forge_identity import ForgeIdentity
+from webhook_to_fedora_messaging.models.outbox import OutboxMessage
 from webhook_to_fedora_messaging.models.service import Service
+from webhook_to_fedora_messaging.service_cache import get_service_cache, ServiceSnapshot
 
 
 @pytest.fixture()
@@ -78,6 +98,20 @@ def sent_messages() -> Generator[list[Message]]:
         yield sent
 
 
+@pytest.fixture()
+def outbox_enabled() -> Generator[mock.Mock]:
+    """
+    For storing messages in the outbox instead of publishing them right away
+    """
+    with (
+        mock.patch.object(get_config().outbox, "enabled", True),
+        mock.patch(
+            "webhook_to_fedora_messaging.endpoints.message.get_outbox_publisher"
+        ) as get_outbox_publisher,
+    ):
+        yield get_outbox_publisher.return_value
+
+
 @pytest.mark.parametrize(
     "kind, schema, username, request_data, db_service, request_headers",
     [
@@ -134,7 +168,16 @@ async def test_message_create(
     else:
         # FAJSON only has mapping data for Github at the moment
         assert sent_msg.agent_name is None
-    assert sent_msg.body["body"] == json.loads(request_data)
+    payload = json.loads(request_data)
+    assert sent_msg.body["body"].keys() == payload.keys()
+    assert sent_msg.body["body"]["commits"] == payload["commits"]
+    # The API URLs were pruned
+    assert {key for key in sent_msg.body["body"]["sender"] if key.endswith("_url")} == {
+        "html_url",
+        "avatar_url",
+    }
+    assert str(sent_msg)
+    assert get_service_counters().pending(db_service.id)["sent"] == 1
     assert response.json() == {
         "data": {
             "message_id": sent_msg.id,
@@ -143,6 +186,512 @@ async def test_message_create(
     }
 
 
+@pytest.mark.parametrize(
+    "allowlist, expected",
+    [
+        pytest.param(
+            None,
+            {"x-forgejo-event", "x-forgejo-delivery", "x-hub-signature", "x-hub-signature-256"},
+            id="default",
+        ),
+        pytest.param(
+            ["X-Forwarded-For"],
+            {
+                "x-forgejo-event",
+                "x-forgejo-delivery",
+                "x-hub-signature",
+                "x-hub-signature-256",
+                "x-forwarded-for",
+            },
+            id="configured",
+        ),
+        pytest.param(["*"], None, id="all"),
+    ],
+)
+@pytest.mark.parametrize(
+    "request_data, db_service, request_headers",
+    [pytest.param("forgejo", "forgejo", "forgejo", id="Forgejo")],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_headers(
+    client: AsyncClient,
+    db_service: Service,
+    request_data: str,
+    request_headers: dict[str, str],
+    sent_messages: list[Message],
+    allowlist: list[str] | None,
+    expected: set[str] | None,
+) -> None:
+    """
+    Keeping only some of the headers in the message
+    """
+    header_allowlists = {} if allowlist is None else {"forgejo": allowlist}
+    with mock.patch.object(get_config().webhooks, "header_allowlists", header_allowlists):
+        response = await client.post(
+            f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+        )
+    assert response.status_code == 202, response.text
+    headers = sent_messages[0].body["headers"]
+    if expected is None:
+        assert set(request_headers).issubset(headers)
+    else:
+        assert set(headers) == expected
+        assert headers["x-forgejo-event"] == "push"
+
+
+@pytest.mark.parametrize(
+    "pruning_profiles, prune_payloads, pruned",
+    [
+        pytest.param(None, True, {"keys_url", "hooks_url"}, id="default"),
+        pytest.param({"push": ["repository.hooks_url"]}, True, {"hooks_url"}, id="service"),
+        pytest.param({}, True, set(), id="service-opt-out"),
+        pytest.param(None, False, set(), id="global-opt-out"),
+    ],
+)
+@pytest.mark.parametrize(
+    "request_data, db_service, request_headers",
+    [pytest.param("github", "github", "github", id="GitHub")],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_pruning(
+    client: AsyncClient,
+    db_service: Service,
+    db_session: AsyncSession,
+    request_data: str,
+    request_headers: dict[str, str],
+    fasjson_client: mock.Mock,
+    sent_messages: list[Message],
+    pruning_profiles: dict[str, list[str]] | None,
+    prune_payloads: bool,
+    pruned: set[str],
+) -> None:
+    """
+    Removing keys from the payload with the pruning profiles
+    """
+    fasjson_client.get_username_from_github = mock.AsyncMock(return_value=None)
+    db_service.pruning_profiles = pruning_profiles
+    await db_session.commit()
+    with mock.patch.object(get_config().webhooks, "prune_payloads", prune_payloads):
+        response = await client.post(
+            f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+        )
+    assert response.status_code == 202, response.text
+    payload = json.loads(request_data)
+    sent_repository = sent_messages[0].body["body"]["repository"]
+    assert set(payload["repository"]) - set(sent_repository) >= pruned
+    assert sent_repository["html_url"] == payload["repository"]["html_url"]
+    if not pruned:
+        assert sent_messages[0].body["body"] == payload
+    # The payloads that were not pruned are published as they were received
+    assert isinstance(sent_messages[0], RawBodyMessage) is (not pruned)
+    encoded_body = sent_messages[0]._encoded_body
+    assert (request_data.encode() in encoded_body) is (not pruned)
+    assert json.loads(encoded_body) == sent_messages[0].body
+
+
+@pytest.mark.parametrize(
+    "request_data, db_service, request_headers",
+    [pytest.param("forgejo", "forgejo", "forgejo", id="Forgejo")],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_raw_body(
+    client: AsyncClient,
+    db_service: Service,
+    request_data: str,
+    request_headers: dict[str, str],
+    sent_messages: list[Message],
+) -> None:
+    """
+    Publishing the payload as it was received
+    """
+    with mock.patch.object(get_config().webhooks, "prune_payloads", False):
+        response = await client.post(
+            f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+        )
+    assert response.status_code == 202, response.text
+    message = sent_messages[0]
+    assert isinstance(message, ForgejoMessageV1)
+    assert isinstance(message, RawBodyMessage)
+    assert message._encoded_body.startswith(b'{"body": ' + request_data.encode() + b", ")
+    assert json.loads(message._encoded_body) == message.body
+    assert message._headers["fedora_messaging_schema"] == get_name(ForgejoMessageV1)
+    # Changing the payload after the message was built
+    message.body = {**message.body, "body": {"zen": "Keep it logically awesome."}}
+    assert json.loads(message._encoded_body) == message.body
+
+
+RAW_PAYLOAD = '{"zen": "Ça va", "sender": {"login": "dummy-login"}}'
+
+
+@pytest.mark.parametrize(
+    "db_service",
+    [pytest.param("forgejo", id="Forgejo")],
+    indirect=["db_service"],
+)
+@pytest.mark.parametrize(
+    "content",
+    [
+        pytest.param(codecs.BOM_UTF8 + RAW_PAYLOAD.encode(), id="utf-8-bom"),
+        pytest.param(RAW_PAYLOAD.encode("utf-16"), id="utf-16"),
+        pytest.param(RAW_PAYLOAD.encode(), id="utf-8"),
+    ],
+)
+async def test_message_create_raw_body_encoding(
+    client: AsyncClient,
+    db_service: Service,
+    sent_messages: list[Message],
+    content: bytes,
+) -> None:
+    """
+    Only publishing the payload as it was received when it is plain UTF-8
+    """
+    sign = hmac.new(
+        db_service.token.encode("utf-8"), msg=content, digestmod=hashlib.sha256
+    ).hexdigest()
+    headers = {"x-hub-signature-256": f"sha256={sign}", "x-forgejo-event": "push"}
+    with (
+        mock.patch.object(get_config().webhooks, "prune_payloads", False),
+        # A decoder that accepts the other encodings of JSON
+        mock.patch("webhook_to_fedora_messaging.endpoints.parser.base.json_loads", json.loads),
+        mock.patch(
+            "webhook_to_fedora_messaging.endpoints.parser.forgejo.ForgejoParser._get_topic",
+            return_value="forgejo.push",
+        ),
+    ):
+        response = await client.post(
+            f"/api/v1/messages/{db_service.uuid}", content=content, headers=headers
+        )
+    assert response.status_code == 202, response.text
+    message = sent_messages[0]
+    assert isinstance(message, RawBodyMessage) is (content.startswith(b"{"))
+    assert json.loads(message._encoded_body.decode("utf-8")) == message.body
+    assert message.body["body"] == json.loads(RAW_PAYLOAD)
+
+
+@pytest.mark.parametrize(
+    "kind, username, request_data, db_service, request_headers",
+    [
+        pytest.param(
+            "github",
+            "dummy-fas-username",
+            "github",
+            "github",
+            "github",
+            id="GitHub",
+        ),
+        pytest.param(
+            "forgejo",
+            "gridhgead",
+            "forgejo",
+            "forgejo",
+            "forgejo",
+            id="Forgejo",
+        ),
+    ],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_redelivery(
+    client: AsyncClient,
+    db_service: Service,
+    request_data: str,
+    request_headers: dict[str, str],
+    fasjson_client: mock.Mock,
+    sent_messages: list[Message],
+    kind: str,
+    username: str,
+) -> None:
+    """
+    Sending the same delivery several times
+    """
+    lookup = mock.AsyncMock(return_value=username)
+    setattr(fasjson_client, f"get_username_from_{kind}", lookup)
+    responses = await asyncio.gather(
+        *[
+            client.post(
+                f"/api/v1/messages/{db_service.uuid}",
+                content=request_data,
+                headers=request_headers,
+            )
+            for _i in range(3)
+        ]
+    )
+    response = await client.post(
+        f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+    )
+    assert [r.status_code for r in [*responses, response]] == [202] * 4
+    assert len(sent_messages) == 1
+    assert {r.json()["data"]["message_id"] for r in [*responses, response]} == {sent_messages[0].id}
+    assert get_service_counters().pending(db_service.id)["sent"] == 1
+
+    # Another delivery of the same event
+    request_headers[f"x-{kind}-delivery"] = "other-delivery"
+    response = await client.post(
+        f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+    )
+    assert response.status_code == 202, response.text
+    assert len(sent_messages) == 2
+    assert response.json()["data"]["message_id"] == sent_messages[1].id
+
+
+@pytest.mark.parametrize(
+    "kind, request_data, db_service, request_headers",
+    [
+        pytest.param(
+            "github",
+            "github",
+            "github",
+            "github",
+            id="GitHub",
+        ),
+        pytest.param(
+            "forgejo",
+            "forgejo",
+            "forgejo",
+            "forgejo",
+            id="Forgejo",
+        ),
+    ],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_filtered_event(
+    client: AsyncClient,
+    db_service: Service,
+    db_session: AsyncSession,
+    request_data: str,
+    request_headers: dict[str, str],
+    sent_messages: list[Message],
+    kind: str,
+) -> None:
+    """
+    Sending an event that the service ignores
+    """
+    db_service.denied_events = ["push"]
+    await db_session.commit()
+    sent_chunks = []
+
+    async def _stream() -> AsyncGenerator[bytes, None]:
+        sent_chunks.append(request_data.encode())
+        yield request_data.encode()
+
+    response = await client.post(
+        f"/api/v1/messages/{db_service.uuid}", content=_stream(), headers=request_headers
+    )
+    assert response.status_code == 202, response.text
+    assert response.json() == {"data": {"message_id": None, "url": None}}
+    assert sent_messages == []
+    # The payload was not read
+    assert sent_chunks == []
+
+
+@pytest.mark.parametrize(
+    "kind, request_data, db_service, request_headers",
+    [
+        pytest.param(
+            "github",
+            "github",
+            "github",
+            "github",
+            id="GitHub",
+        ),
+        pytest.param(
+            "forgejo",
+            "forgejo",
+            "forgejo",
+            "forgejo",
+            id="Forgejo",
+        ),
+    ],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_routing_rules(
+    client: AsyncClient,
+    db_service: Service,
+    db_session: AsyncSession,
+    request_data: str,
+    request_headers: dict[str, str],
+    fasjson_client: mock.Mock,
+    sent_messages: list[Message],
+    kind: str,
+) -> None:
+    """
+    Sending data that the routing rules of the service drop
+    """
+    fasjson_client.get_username_from_github = mock.AsyncMock(return_value="dummy-fas-username")
+    db_service.routing_rules = [{"ref": "refs/tags/*"}]
+    await db_session.commit()
+    response = await client.post(
+        f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+    )
+    assert response.status_code == 202, response.text
+    assert response.json()["data"]["message_id"] is None
+    assert sent_messages == []
+    fasjson_client.get_username_from_github.assert_not_called()
+    assert get_service_counters().pending(db_service.id) == {"dropped": 1}
+
+    db_service.routing_rules = [{"ref": "refs/tags/*"}, {"ref": "refs/heads/*"}]
+    await db_session.commit()
+    get_service_cache().invalidate(db_service.uuid)
+    response = await client.post(
+        f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+    )
+    assert response.status_code == 202, response.text
+    assert len(sent_messages) == 1
+    assert response.json()["data"]["message_id"] == sent_messages[0].id
+
+
+@pytest.mark.parametrize(
+    "kind, request_data, db_service, request_headers",
+    [
+        pytest.param(
+            "github",
+            "github",
+            "github",
+            "github",
+            id="GitHub",
+        ),
+        pytest.param(
+            "forgejo",
+            "forgejo",
+            "forgejo",
+            "forgejo",
+            id="Forgejo",
+        ),
+    ],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_duplicate_payload(
+    client: AsyncClient,
+    db_service: Service,
+    db_session: AsyncSession,
+    request_data: str,
+    request_headers: dict[str, str],
+    fasjson_client: mock.Mock,
+    sent_messages: list[Message],
+    kind: str,
+) -> None:
+    """
+    Sending the same payload through the organization and the repository webhooks
+    """
+    fasjson_client.get_username_from_github = mock.AsyncMock(return_value="dummy-fas-username")
+    org_service = Service(uuid="dummy-org-uuid", name="Demo Org", type=kind, token=db_service.token)
+    db_session.add(org_service)
+    await db_session.commit()
+    with mock.patch.object(get_config().webhooks, "duplicates_window", 60.0):
+        response = await client.post(
+            f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+        )
+        assert response.status_code == 202, response.text
+        request_headers[f"x-{kind}-delivery"] = "org-delivery"
+        org_response = await client.post(
+            f"/api/v1/messages/{org_service.uuid}", content=request_data, headers=request_headers
+        )
+    assert org_response.status_code == 202, org_response.text
+    assert len(sent_messages) == 1
+    assert org_response.json()["data"]["message_id"] == response.json()["data"]["message_id"]
+    counters = get_service_counters()
+    assert counters.pending(db_service.id) == {"sent": 1}
+    assert counters.pending(org_service.id) == {"suppressed": 1}
+
+
+@pytest.mark.parametrize(
+    "request_data, db_service, request_headers",
+    [pytest.param("github", "github", "github", id="GitHub")],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_duplicate_payload_pruning(
+    client: AsyncClient,
+    db_service: Service,
+    db_session: AsyncSession,
+    request_data: str,
+    request_headers: dict[str, str],
+    fasjson_client: mock.Mock,
+    sent_messages: list[Message],
+) -> None:
+    """
+    Sending the same payload through services that prune it differently
+    """
+    fasjson_client.get_username_from_github = mock.AsyncMock(return_value="dummy-fas-username")
+    # This service keeps the full payloads
+    db_service.pruning_profiles = {}
+    services = [
+        Service(uuid=f"dummy-org-uuid-{index}", name=f"Demo Org {index}", type="github")
+        for index in range(2)
+    ]
+    for service in services:
+        service.token = db_service.token
+        db_session.add(service)
+    await db_session.commit()
+    responses = []
+    with mock.patch.object(get_config().webhooks, "duplicates_window", 60.0):
+        for index, service in enumerate([db_service, *services]):
+            request_headers["x-github-delivery"] = f"delivery-{index}"
+            response = await client.post(
+                f"/api/v1/messages/{service.uuid}", content=request_data, headers=request_headers
+            )
+            assert response.status_code == 202, response.text
+            responses.append(response.json()["data"]["message_id"])
+    # The services with the default profiles sent it once, in addition to the full payload
+    assert len(sent_messages) == 2
+    assert sent_messages[0].body["body"] == json.loads(request_data)
+    assert sent_messages[1].body["body"] != json.loads(request_data)
+    assert responses == [sent_messages[0].id, sent_messages[1].id, sent_messages[1].id]
+    counters = get_service_counters()
+    assert counters.pending(db_service.id) == {"sent": 1}
+    assert counters.pending(services[0].id) == {"sent": 1}
+    assert counters.pending(services[1].id) == {"suppressed": 1}
+
+
+async def _slow_send(message_id: str | None) -> str | None:
+    await asyncio.sleep(0.01)
+    return message_id
+
+
+async def test_message_create_duplicate_payload_dropped(db: AsyncDatabaseManager) -> None:
+    """
+    Sending once the payload that the first of several services dropped
+    """
+    duplicates = DeliveryStore(maxsize=10, ttl=60, name="payload")
+    services = [
+        ServiceSnapshot(
+            id=index,
+            uuid=f"dummy-uuid-{index}",
+            name=f"Dummy service {index}",
+            type="github",
+            token="dummy-token",  # noqa: S106
+            disabled=False,
+            max_body_size=None,
+            allowed_events=None,
+            denied_events=None,
+            routing_rules=None,
+            pruning_profiles=None,
+        )
+        for index in range(4)
+    ]
+    sends = []
+    for index in range(4):
+        # The first service's routing rules drop the payload
+        message_id = None if index == 0 else f"dummy-message-{index}"
+        sends.append(mock.AsyncMock(side_effect=partial(_slow_send, message_id)))
+
+    # The other services receive the payload while the first one is handling it
+    results = await asyncio.gather(
+        *[
+            _send_unique_payload(duplicates, services[index], b"{}", "dummy", sends[index])
+            for index in range(3)
+        ]
+    )
+    assert results == [None, "dummy-message-1", "dummy-message-1"]
+    # And another one later
+    assert (
+        await _send_unique_payload(duplicates, services[3], b"{}", "dummy", sends[3])
+        == "dummy-message-1"
+    )
+    assert [send.await_count for send in sends] == [1, 1, 0, 0]
+    counters = get_service_counters()
+    assert counters.pending(2) == {"suppressed": 1}
+    assert counters.pending(3) == {"suppressed": 1}
+
+
 @pytest.mark.parametrize(
     "kind, username, request_data, db_service, request_headers",
     [
@@ -192,6 +741,98 @@ async def test_message_create_failure(
     assert response.status_code == 502, response.text
 
 
+@pytest.mark.parametrize(
+    "request_data, db_service, request_headers",
+    [
+        pytest.param(
+            "forgejo",
+            "forgejo",
+            "forgejo",
+            id="Forgejo",
+        ),
+    ],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_forgejo_agent(
+    client: AsyncClient,
+    db_service: Service,
+    db_session: AsyncSession,
+    request_data: str,
+    request_headers: dict[str, str],
+    sent_messages: list[Message],
+) -> None:
+    """
+    Sending data from a Forgejo user whose FAS username is stored locally
+    """
+    db_session.add(
+        ForgeIdentity(forge="forgejo", forge_username="gridhead", fas_username="gridhead-fas")
+    )
+    await db_session.commit()
+    response = await client.post(
+        f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+    )
+    assert response.status_code == 202, response.text
+    assert sent_messages[0].agent_name == "gridhead-fas"
+
+
+@pytest.mark.parametrize(
+    "request_data, db_service, request_headers",
+    [
+        pytest.param(
+            "github",
+            "github",
+            "github",
+            id="GitHub",
+        ),
+    ],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_agent_timeout(
+    client: AsyncClient,
+    db_service: Service,
+    request_data: str,
+    request_headers: dict[str, str],
+    fasjson_client: mock.Mock,
+    sent_messages: list[Message],
+) -> None:
+    """
+    Sending data without waiting for a slow agent lookup
+    """
+    lookup_released = asyncio.Event()
+
+    async def _slow_lookup(username: str) -> str:
+        await lookup_released.wait()
+        return "dummy-fas-username"
+
+    fasjson_client.get_username_from_github = mock.AsyncMock(side_effect=_slow_lookup)
+    with mock.patch.object(get_config().fasjson, "agent_timeout", 0.01):
+        response = await client.post(
+            f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+        )
+    assert response.status_code == 202, response.text
+    assert len(sent_messages) == 1
+    assert sent_messages[0].agent_name is None
+    # The lookup goes on in the background
+    assert len(_background_lookups) == 1
+    lookup = next(iter(_background_lookups))
+    lookup_released.set()
+    assert await lookup == "dummy-fas-username"
+    assert len(_background_lookups) == 0
+
+
+@pytest.mark.parametrize("message_id", ["d3b8c4c4-3d8a-4f61-8d3e-6f0b4b7d3e1a", None])
+async def test_message_responses(app_config: None, message_id: str | None) -> None:
+    """
+    Serializing the responses as FastAPI would from the response model
+    """
+    response = get_message_responses().render(message_id)
+    assert response.status_code == 202
+    expected = MessageResult.model_validate({"data": {"message_id": message_id}})
+    assert response.body == json.dumps(
+        jsonable_encoder(expected), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
 @pytest.mark.parametrize(
     "kind, request_data, db_service, request_headers",
     [
@@ -222,10 +863,10 @@ async def test_message_create_400(
     """
     Sending data with wrong information
     """
-    hmac.compare_digest = mock.MagicMock(return_value=False)
-    response = await client.post(
-        f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
-    )
+    with mock.patch("hmac.compare_digest", return_value=False):
+        response = await client.post(
+            f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+        )
     assert response.status_code == 400
 
 
@@ -251,9 +892,171 @@ async def test_message_create_404(client: AsyncClient) -> None:
     ],
     indirect=["db_service"],
 )
-async def test_message_create_bad_request(client: AsyncClient, db_service: Service) -> None:
+@pytest.mark.parametrize(
+    "content",
+    [
+        pytest.param(b"not json", id="not-json"),
+        pytest.param(b"[]", id="not-object"),
+        pytest.param(codecs.BOM_UTF8 + b'{"a": 1}', id="utf-8-bom"),
+        pytest.param('{"a": 1}'.encode("utf-16"), id="utf-16"),
+    ],
+)
+async def test_message_create_bad_request(
+    client: AsyncClient, db_service: Service, content: bytes
+) -> None:
     """
-    Sending data with wrong format
+    Sending data with wrong format or encoding
     """
-    response = await client.post(f"/api/v1/messages/{db_service.uuid}", content="not json")
+    sign = hmac.new(
+        db_service.token.encode("utf-8"), msg=content, digestmod=hashlib.sha256
+    ).hexdigest()
+    response = await client.post(
+        f"/api/v1/messages/{db_service.uuid}",
+        content=content,
+        headers={"x-hub-signature-256": f"sha256={sign}"},
+    )
     assert response.status_code == 422
+
+
+@pytest.mark.parametrize(
+    "request_data, db_service, request_headers",
+    [
+        pytest.param(
+            "github",
+            "github",
+            "github",
+            id="GitHub",
+        ),
+    ],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_too_large(
+    client: AsyncClient,
+    db_service: Service,
+    request_data: str,
+    request_headers: dict[str, str],
+) -> None:
+    """
+    Sending a payload larger than the allowed size
+    """
+    with mock.patch.object(get_config().webhooks, "max_body_size", 100):
+        response = await client.post(
+            f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+        )
+    assert response.status_code == 413, response.text
+    assert response.json() == {"detail": "The payload is larger than the allowed size (100 bytes)"}
+
+
+@pytest.mark.parametrize(
+    "request_data, db_service, request_headers",
+    [
+        pytest.param(
+            "github",
+            "github",
+            "github",
+            id="GitHub",
+        ),
+    ],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_too_large_service(
+    client: AsyncClient,
+    db_service: Service,
+    db_session: AsyncSession,
+    request_data: str,
+    request_headers: dict[str, str],
+) -> None:
+    """
+    A service can't allow payloads larger than the global limit
+    """
+    db_service.max_body_size = 10 * 1024 * 1024
+    await db_session.commit()
+    with mock.patch.object(get_config().webhooks, "max_body_size", 100):
+        response = await client.post(
+            f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+        )
+    assert response.status_code == 413, response.text
+    assert response.json() == {"detail": "The payload is larger than the allowed size (100 bytes)"}
+
+
+@pytest.mark.parametrize(
+    "request_data, db_service, request_headers",
+    [
+        pytest.param(
+            "github",
+            "github",
+            "github",
+            id="GitHub",
+        ),
+    ],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_too_large_streamed(
+    client: AsyncClient,
+    db_service: Service,
+    db_session: AsyncSession,
+    request_data: str,
+    request_headers: dict[str, str],
+) -> None:
+    """
+    Sending a payload without its size, larger than the service's allowed size
+    """
+    db_service.max_body_size = 1000
+    await db_session.commit()
+    data = request_data.encode("utf-8")
+    chunk_size = 500
+    sent_chunks = []
+
+    async def stream() -> AsyncGenerator[bytes]:
+        for start in range(0, len(data), chunk_size):
+            sent_chunks.append(start)
+            yield data[start : start + chunk_size]
+
+    response = await client.post(
+        f"/api/v1/messages/{db_service.uuid}", content=stream(), headers=request_headers
+    )
+    assert response.status_code == 413, response.text
+    # Reading stopped as soon as the limit was crossed
+    assert len(sent_chunks) == 3
+    assert len(data) > 3 * chunk_size
+
+
+@pytest.mark.parametrize(
+    "request_data, db_service, request_headers",
+    [
+        pytest.param(
+            "github",
+            "github",
+            "github",
+            id="GitHub",
+        ),
+    ],
+    indirect=["request_data", "db_service", "request_headers"],
+)
+async def test_message_create_outbox(
+    client: AsyncClient,
+    db_service: Service,
+    db_session: AsyncSession,
+    request_data: str,
+    request_headers: dict[str, str],
+    fasjson_client: mock.Mock,
+    sent_messages: list[Message],
+    outbox_enabled: mock.Mock,
+) -> None:
+    """
+    Sending data and storing the message in the outbox
+    """
+    fasjson_client.get_username_from_github = mock.AsyncMock(return_value="dummy-fas-username")
+    response = await client.post(
+        f"/api/v1/messages/{db_service.uuid}", content=request_data, headers=request_headers
+    )
+    assert response.status_code == 202, response.text
+    # The message is not published during the request
+    assert sent_messages == []
+    outbox_enabled.wake_up.assert_called_once_with()
+    outbox = (await db_session.scalars(select(OutboxMessage))).all()
+    assert len(outbox) == 1
+    assert outbox[0].message_id == response.json()["data"]["message_id"]
+    assert outbox[0].service_id == db_service.id
+    assert outbox[0].sent_date is None
+    assert get_service_counters().pending(db_service.id)["sent"] == 1
@@ -0,0 +1,97 @@
+import hmac
+from typing import Any
+from unittest import mock
+
+import pytest
+from starlette.requests import Request
+
+from webhook_to_fedora_messaging.config import get_config
+from webhook_to_fedora_messaging.endpoints.parser.base import _get_keyed_hmac
+from webhook_to_fedora_messaging.endpoints.parser.github import GitHubParser
+from webhook_to_fedora_messaging.exceptions import SignatureMatchError
+
+
+TOKEN = "dummy-service-token"  # noqa: S105
+
+
+def _sign(data: bytes, algorithm: str = "sha256") -> str:
+    digest = hmac.new(TOKEN.encode("utf-8"), msg=data, digestmod=algorithm).hexdigest()
+    return f"{algorithm}={digest}"
+
+
+def _request(
+    data: bytes, sig_header: str, chunk_size: int | None = None, content_length: bool = True
+) -> Request:
+    """
+    A request streaming the payload in chunks, like the ASGI servers do.
+    """
+    chunk_size = chunk_size or len(data) or 1
+    chunks = [data[start : start + chunk_size] for start in range(0, len(data), chunk_size)]
+    headers = [(b"x-hub-signature-256", sig_header.encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(data)).encode()))
+
+    async def receive() -> dict[str, Any]:
+        body = chunks.pop(0) if chunks else b""
+        return {"type": "http.request", "body": body, "more_body": bool(chunks)}
+
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive)
+
+
+async def _verify(data: bytes, sig_header: str, **kwargs: Any) -> bytes:
+    parser = GitHubParser(TOKEN, _request(data, sig_header, **kwargs))
+    _headers, received = await parser.get_headers_and_data()
+    return received
+
+
+async def test_signature(app_config: None) -> None:
+    """
+    Verifying payload signatures with a prepared HMAC state
+    """
+    _get_keyed_hmac.cache_clear()
+    for data in (b'{"a": 1}', b'{"b": 2}'):
+        assert await _verify(data, _sign(data)) == data
+    assert _get_keyed_hmac.cache_info().misses == 1
+    assert _get_keyed_hmac.cache_info().hits == 1
+    with pytest.raises(SignatureMatchError):
+        await _verify(b'{"a": 1}', _sign(b"other"))
+
+
+@pytest.mark.parametrize("content_length", [True, False])
+async def test_signature_large_payload(app_config: None, content_length: bool) -> None:
+    """
+    Verifying the signature of a large payload in a worker thread, in batches of chunks
+    """
+    data = b'{"a": "' + b"a" * 1000 + b'"}'
+    with (
+        mock.patch.object(get_config().webhooks, "hmac_offload_threshold", 100),
+        mock.patch(
+            "webhook_to_fedora_messaging.endpoints.parser.base.run_in_threadpool",
+            wraps=lambda function, *args: function(*args),
+        ) as run_in_threadpool,
+    ):
+        received = await _verify(data, _sign(data), chunk_size=30, content_length=content_length)
+        assert received == data
+        # Each batch is larger than the threshold, the last one can be smaller
+        batches = [call.args[1] for call in run_in_threadpool.call_args_list]
+        assert b"".join(chunk for batch in batches for chunk in batch) == (
+            data if content_length else data[90:]
+        )
+        assert all(sum(len(chunk) for chunk in batch) >= 100 for batch in batches[:-1])
+        assert len(batches) < len(data) // 30
+        with pytest.raises(SignatureMatchError):
+            await _verify(data, _sign(b"{}"), chunk_size=30, content_length=content_length)
+        # Small payloads are verified on the event loop
+        run_in_threadpool.reset_mock()
+        await _verify(b"{}", _sign(b"{}"), content_length=content_length)
+        run_in_threadpool.assert_not_called()
+
+
+async def test_signature_unsupported_algorithm(app_config: None) -> None:
+    """
+    Verifying a signature made with an unknown algorithm
+    """
+    with pytest.raises(SignatureMatchError, match="Unsupported algorithm"):
+        await _verify(b"{}", "dummy=abcdef")
+    # The other algorithms are supported
+    await _verify(b"{}", _sign(b"{}", "sha1"))
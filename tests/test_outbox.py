@@ -0,0 +1,165 @@
+import asyncio
+from collections.abc import Generator
+from datetime import datetime, UTC
+from unittest import mock
+
+import pytest
+from fedora_messaging.api import Message
+from fedora_messaging.exceptions import ConnectionException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from twisted.internet import defer
+from twisted.internet.defer import Deferred
+from webhook_to_fedora_messaging_messages.github import GitHubMessageV1
+
+from webhook_to_fedora_messaging.models.outbox import OutboxMessage
+from webhook_to_fedora_messaging.models.service import Service
+from webhook_to_fedora_messaging.outbox import enqueue, OutboxPublisher
+
+
+@pytest.fixture()
+def publisher() -> OutboxPublisher:
+    return OutboxPublisher(
+        batch_size=10, poll_interval=0.1, max_backoff=60, max_attempts=3, retention=3600
+    )
+
+
+@pytest.fixture()
+def sent_messages() -> Generator[list[Message]]:
+    sent = []
+
+    def _add_and_return(message: Message, exchange: str | None = None) -> Deferred[None]:
+        sent.append(message)
+        return defer.succeed(None)
+
+    with mock.patch(
+        "webhook_to_fedora_messaging.publishing.api.twisted_publish", side_effect=_add_and_return
+    ):
+        yield sent
+
+
+async def _fill_outbox(db_session: AsyncSession, service: Service, count: int) -> list[Message]:
+    messages = [Message(topic="dummy.topic", body={"index": index}) for index in range(count)]
+    for message in messages:
+        await enqueue(db_session, message, service.id)
+    await db_session.commit()
+    return messages
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_outbox_drain(
+    db_session: AsyncSession,
+    db_service: Service,
+    publisher: OutboxPublisher,
+    sent_messages: list[Message],
+) -> None:
+    """
+    Publishing the messages stored in the outbox
+    """
+    messages = await _fill_outbox(db_session, db_service, 2)
+    assert await publisher.drain() == 2
+    assert {m.id for m in sent_messages} == {m.id for m in messages}
+    assert [m.body for m in sent_messages] == [{"index": 0}, {"index": 1}]
+    db_session.expire_all()
+    rows = (await db_session.scalars(select(OutboxMessage))).all()
+    assert all(row.sent_date is not None for row in rows)
+    # Nothing left to publish
+    assert await publisher.drain() == 0
+    assert len(sent_messages) == 2
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_outbox_drain_batch(
+    db_session: AsyncSession,
+    db_service: Service,
+    publisher: OutboxPublisher,
+    sent_messages: list[Message],
+) -> None:
+    """
+    Publishing the messages stored in the outbox in batches
+    """
+    publisher.batch_size = 2
+    await _fill_outbox(db_session, db_service, 3)
+    assert await publisher.drain() == 2
+    assert await publisher.drain() == 1
+    assert len(sent_messages) == 3
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_outbox_drain_failure(
+    db_session: AsyncSession,
+    db_service: Service,
+    publisher: OutboxPublisher,
+) -> None:
+    """
+    Retrying the messages that could not be published
+    """
+    await _fill_outbox(db_session, db_service, 1)
+    with mock.patch(
+        "webhook_to_fedora_messaging.outbox.publish", side_effect=ConnectionException
+    ) as publish:
+        assert await publisher.drain() == 1
+        publish.assert_called_once()
+        # The retry is not due yet
+        assert await publisher.drain() == 0
+    row = await db_session.scalar(select(OutboxMessage))
+    assert row is not None
+    await db_session.refresh(row)
+    assert row.sent_date is None
+    assert row.attempts == 1
+    assert row.last_error is not None
+    assert row.next_attempt.replace(tzinfo=UTC) > datetime.now(tz=UTC)
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_outbox_attach_agent(
+    db_session: AsyncSession,
+    db_service: Service,
+    publisher: OutboxPublisher,
+    sent_messages: list[Message],
+) -> None:
+    """
+    Looking up the agents that were left out of the messages before publishing them
+    """
+    publisher.attach_agent = True
+    headers = dict.fromkeys(GitHubMessageV1.body_schema["properties"]["headers"]["required"], "")
+    for login in ("dummy-login", "unknown-login"):
+        message = GitHubMessageV1(
+            topic="github.push",
+            body={"body": {"sender": {"login": login}}, "headers": headers, "agent": None},
+        )
+        await enqueue(db_session, message, db_service.id)
+    await db_session.commit()
+    fasjson = mock.Mock(name="fasjson")
+    fasjson.get_username_from_github = mock.AsyncMock(
+        side_effect=lambda login: "dummy-fas-username" if login == "dummy-login" else None
+    )
+    with mock.patch(
+        "webhook_to_fedora_messaging.endpoints.parser.github.get_fasjson", return_value=fasjson
+    ):
+        assert await publisher.drain() == 2
+    agents = {m.body["body"]["sender"]["login"]: m.agent_name for m in sent_messages}
+    assert agents == {"dummy-login": "dummy-fas-username", "unknown-login": None}
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_outbox_run(
+    db_session: AsyncSession,
+    db_service: Service,
+    publisher: OutboxPublisher,
+    sent_messages: list[Message],
+) -> None:
+    """
+    Draining the outbox in the background
+    """
+    await publisher.start()
+    try:
+        await _fill_outbox(db_session, db_service, 1)
+        publisher.wake_up()
+        for _ in range(50):
+            if sent_messages:
+                break
+            await asyncio.sleep(0.1)
+    finally:
+        await publisher.stop()
+    assert len(sent_messages) == 1
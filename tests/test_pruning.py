@@ -0,0 +1,92 @@
+import copy
+from typing import Any
+
+import pytest
+
+from webhook_to_fedora_messaging.pruning import NO_PRUNING, PruningProfile, PruningProfiles
+
+
+BODY: dict[str, Any] = {
+    "ref": "refs/heads/main",
+    "repository": {
+        "full_name": "fedora-infra/anitya",
+        "html_url": "https://github.com/fedora-infra/anitya",
+        "hooks_url": "https://api.github.com/repos/fedora-infra/anitya/hooks",
+        "owner": {"login": "fedora-infra", "repos_url": "https://api.github.com/users/x/repos"},
+    },
+    "commits": [
+        {"id": "abc", "author": {"name": "Dummy", "email": "dummy@example.com"}},
+        {"id": "def", "author": {"name": "Other", "email": "other@example.com"}},
+    ],
+}
+
+
+def _leaves(node: Any, prefix: str = "") -> set[str]:
+    if isinstance(node, list):
+        return set().union(*[_leaves(item, prefix) for item in node])
+    if isinstance(node, dict):
+        return set().union(*[_leaves(value, f"{prefix}{key}.") for key, value in node.items()])
+    return {prefix.rstrip(".")}
+
+
+@pytest.mark.parametrize(
+    "paths,removed",
+    [
+        (["ref"], {"ref"}),
+        (["repository.*_url"], {"repository.html_url", "repository.hooks_url"}),
+        (["repository.*_url", "!repository.html_url"], {"repository.hooks_url"}),
+        (["repository.owner"], {"repository.owner.login", "repository.owner.repos_url"}),
+        (
+            ["**.*_url", "!**.html_url"],
+            {"repository.hooks_url", "repository.owner.repos_url"},
+        ),
+        (["commits.author.email"], {"commits.author.email"}),
+        (["missing.key", "ref.too.deep", "!ref"], set()),
+    ],
+)
+def test_pruning_profile(paths: list[str], removed: set[str]) -> None:
+    """
+    Removing the key paths from a payload
+    """
+    body = copy.deepcopy(BODY)
+    PruningProfile(paths).prune(body)
+    assert _leaves(BODY) - _leaves(body) == removed
+
+
+@pytest.mark.parametrize("path", ["", "repository..html_url", "repository.**"])
+def test_pruning_profile_invalid(path: str) -> None:
+    """
+    Refusing the invalid key paths
+    """
+    with pytest.raises(ValueError):
+        PruningProfile([path])
+
+
+def test_pruning_profiles() -> None:
+    """
+    Combining the profile of all the events with the profile of each event
+    """
+    profiles = PruningProfiles({"*": ["repository.hooks_url"], "push": ["commits"]})
+    body = copy.deepcopy(BODY)
+    profiles.get("push").prune(body)
+    assert set(body) == {"ref", "repository"}
+    assert "hooks_url" not in body["repository"]
+    for event in ("issues", None):
+        body = copy.deepcopy(BODY)
+        profiles.get(event).prune(body)
+        assert set(body) == set(BODY)
+        assert "hooks_url" not in body["repository"]
+
+
+def test_pruning_profiles_fingerprint() -> None:
+    """
+    Identifying the profiles that prune the payloads the same way
+    """
+    profiles = {"*": ["sender.*_url"], "push": ["repository.*_url"]}
+    same = {"push": ("repository.*_url",), "*": ("sender.*_url",)}
+    assert PruningProfiles(profiles).fingerprint == PruningProfiles(same).fingerprint
+    assert (
+        PruningProfiles(profiles).fingerprint
+        != PruningProfiles({"*": ["sender.*_url"]}).fingerprint
+    )
+    assert NO_PRUNING.fingerprint == PruningProfiles({}).fingerprint
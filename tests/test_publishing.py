@@ -0,0 +1,76 @@
+import asyncio
+from collections.abc import Generator
+from unittest import mock
+
+import pytest
+from fedora_messaging.api import Message
+from fedora_messaging.exceptions import PublishReturned, PublishTimeout
+from twisted.internet import defer, reactor
+from twisted.internet.defer import Deferred
+
+from webhook_to_fedora_messaging import publishing
+
+
+@pytest.fixture()
+def pending() -> Generator[list[Deferred[None]]]:
+    """
+    For publishing messages that wait for their confirmation
+    """
+    deferreds: list[Deferred[None]] = []
+
+    def _add_and_return(message: Message, exchange: str | None = None) -> Deferred[None]:
+        deferred: Deferred[None] = defer.Deferred()
+        deferreds.append(deferred)
+        return deferred
+
+    with mock.patch(
+        "webhook_to_fedora_messaging.publishing.api.twisted_publish", side_effect=_add_and_return
+    ):
+        yield deferreds
+
+
+async def _wait_for(deferreds: list[Deferred[None]], count: int) -> None:
+    for _ in range(50):
+        if len(deferreds) == count:
+            return
+        await asyncio.sleep(0.1)
+
+
+async def test_publish_concurrent(pending: list[Deferred[None]]) -> None:
+    """
+    Publishing several messages at the same time
+    """
+    tasks = [
+        asyncio.create_task(publishing.publish(Message(topic="dummy", body={"index": index})))
+        for index in range(10)
+    ]
+    await _wait_for(pending, 10)
+    # All messages are waiting for their confirmation at the same time
+    assert len(pending) == 10
+    assert not any(task.done() for task in tasks)
+    for deferred in pending:
+        reactor.callFromThread(deferred.callback, None)
+    await asyncio.wait_for(asyncio.gather(*tasks), 5)
+
+
+async def test_publish_rejected(pending: list[Deferred[None]]) -> None:
+    """
+    Publishing a message that the broker rejects
+    """
+    task = asyncio.create_task(publishing._publish_from_loop(Message(topic="dummy"), 5))
+    await _wait_for(pending, 1)
+    reactor.callFromThread(pending[0].errback, PublishReturned(reason="dummy"))
+    with pytest.raises(PublishReturned):
+        await task
+
+
+async def test_publish_timeout(pending: list[Deferred[None]]) -> None:
+    """
+    Publishing a message that is never confirmed
+    """
+    with pytest.raises(PublishTimeout):
+        await publishing._publish_from_loop(Message(topic="dummy"), 0.5)
+    assert len(pending) == 1
+    await asyncio.sleep(0.1)
+    # The publication was canceled
+    assert pending[0].called
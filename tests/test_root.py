@@ -1,3 +1,4 @@
+import pytest
 from httpx import AsyncClient
 
 
@@ -8,3 +9,18 @@ async def test_root_redirect(client: AsyncClient) -> None:
     response = await client.get("/")
     assert response.status_code == 307
     assert response.headers.get("location") == "/docs"
+
+
+@pytest.mark.parametrize(
+    "path, cors",
+    [("/api/v1/services", True), ("/api/v1/messages/dummy-uuid", False)],
+)
+async def test_browser_middleware(client: AsyncClient, path: str, cors: bool) -> None:
+    """
+    Only handling CORS on the routes that browsers use
+    """
+    response = await client.options(
+        path,
+        headers={"Origin": "https://example.com", "Access-Control-Request-Method": "POST"},
+    )
+    assert ("access-control-allow-origin" in response.headers) is cors
@@ -0,0 +1,39 @@
+from typing import Any
+
+import pytest
+
+from webhook_to_fedora_messaging.routing import RoutingRules
+
+
+RULES: list[dict[str, Any]] = [
+    {"repository": "fedora-infra/*", "ref": ["refs/heads/main", "refs/tags/*"]},
+    {"repository": "fedora/packages", "action": "opened"},
+]
+
+
+@pytest.mark.parametrize(
+    "body,expected",
+    [
+        ({"repository": {"full_name": "fedora-infra/anitya"}, "ref": "refs/heads/main"}, True),
+        ({"repository": {"full_name": "Fedora-Infra/Anitya"}, "ref": "refs/tags/1.0"}, True),
+        ({"repository": {"full_name": "fedora-infra/anitya"}, "ref": "refs/heads/dev"}, False),
+        ({"repository": {"full_name": "fedora-infra/anitya"}}, False),
+        ({"repository": {"full_name": "fedora/packages"}, "action": "opened"}, True),
+        ({"repository": {"full_name": "fedora/packages"}, "action": "closed"}, False),
+        ({"repository": {"full_name": "other/repo"}, "ref": "refs/heads/main"}, False),
+        ({"zen": "Keep it logically awesome."}, False),
+    ],
+)
+def test_routing_rules(body: dict[str, Any], expected: bool) -> None:
+    """
+    Matching the payloads against the routing rules
+    """
+    assert RoutingRules(RULES).match(body) is expected
+
+
+def test_routing_rules_empty() -> None:
+    """
+    Matching the payloads against no rules, or against an empty rule
+    """
+    assert RoutingRules([]).match({"ref": "refs/heads/main"}) is False
+    assert RoutingRules([{}]).match({"ref": "refs/heads/main"}) is True
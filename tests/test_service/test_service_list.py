@@ -33,6 +33,13 @@ async def test_service_list(
             {
                 "creation_date": db_service.creation_date.isoformat(),
                 "desc": db_service.desc,
+                "max_body_size": None,
+                "allowed_events": None,
+                "denied_events": None,
+                "routing_rules": None,
+                "pruning_profiles": None,
+                "suppressed": 0,
+                "dropped": 0,
                 "name": db_service.name,
                 "token": db_service.token,
                 "type": db_service.type,
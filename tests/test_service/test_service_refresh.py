@@ -4,6 +4,7 @@ import pytest
 from httpx import AsyncClient
 
 from webhook_to_fedora_messaging.models.service import Service
+from webhook_to_fedora_messaging.service_cache import get_service_cache
 
 
 @pytest.mark.parametrize(
@@ -26,9 +27,17 @@ async def test_service_refresh(
     """
     Regenerating access token of an existing service
     """
+    cached = await get_service_cache().get(db_service.uuid)
+    assert cached is not None
     data = {"service_uuid": db_service.uuid}
     response = await client.put(f"/api/v1/services/{db_service.uuid}/regenerate", json=data)
     assert response.status_code == 202
+    # The new token is used for the webhooks
+    new_token = response.json()["data"]["token"]
+    assert new_token != cached.token
+    cached = await get_service_cache().get(db_service.uuid)
+    assert cached is not None
+    assert cached.token == new_token
 
 
 async def test_service_refresh_404(client: AsyncClient, authenticated: mock.MagicMock) -> None:
@@ -4,6 +4,7 @@ import pytest
 from httpx import AsyncClient
 
 from webhook_to_fedora_messaging.models.service import Service
+from webhook_to_fedora_messaging.service_cache import get_service_cache
 
 
 @pytest.mark.parametrize(
@@ -26,8 +27,14 @@ async def test_service_revoke(
     """
     Revoking an existing service
     """
+    cached = await get_service_cache().get(db_service.uuid)
+    assert cached is not None
+    assert cached.disabled is False
     response = await client.put(f"/api/v1/services/{db_service.uuid}/revoke")
     assert response.status_code == 202
+    cached = await get_service_cache().get(db_service.uuid)
+    assert cached is not None
+    assert cached.disabled is True
 
 
 @pytest.mark.parametrize(
@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from webhook_to_fedora_messaging.database import get_or_create
 from webhook_to_fedora_messaging.models import User
 from webhook_to_fedora_messaging.models.service import Service
+from webhook_to_fedora_messaging.service_cache import get_service_cache
 
 
 @pytest.mark.parametrize(
@@ -32,12 +33,159 @@ async def test_service_update(
     """
     Updating an existing service
     """
-    data = {"name": "new name"}
+    await get_service_cache().get(db_service.uuid)
+    data = {"name": "new name", "max_body_size": 1000}
     response = await client.put(f"/api/v1/services/{db_service.uuid}", json={"data": data})
     assert response.status_code == 202, response.text
     assert response.json()["data"]["name"] == "new name"
+    assert response.json()["data"]["max_body_size"] == 1000
     await db_session.refresh(db_service)
     assert db_service.name == "new name"
+    assert db_service.max_body_size == 1000
+    cached = await get_service_cache().get(db_service.uuid)
+    assert cached is not None
+    assert cached.name == "new name"
+    assert cached.max_body_size == 1000
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_service_update_max_body_size(
+    client: AsyncClient,
+    authenticated: mock.MagicMock,
+    db_service: Service,
+    db_session: AsyncSession,
+) -> None:
+    """
+    Removing the size limit of an existing service
+    """
+    db_service.max_body_size = 1000
+    await db_session.commit()
+    data = {"name": "new name"}
+    response = await client.put(f"/api/v1/services/{db_service.uuid}", json={"data": data})
+    assert response.status_code == 202, response.text
+    assert response.json()["data"]["max_body_size"] == 1000
+    response = await client.put(
+        f"/api/v1/services/{db_service.uuid}", json={"data": {"max_body_size": None}}
+    )
+    assert response.status_code == 202, response.text
+    assert response.json()["data"]["max_body_size"] is None
+    await db_session.refresh(db_service)
+    assert db_service.max_body_size is None
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_service_update_events(
+    client: AsyncClient,
+    authenticated: mock.MagicMock,
+    db_service: Service,
+    db_session: AsyncSession,
+) -> None:
+    """
+    Filtering the events of an existing service
+    """
+    data = {"allowed_events": ["push", "pull_request"], "denied_events": ["ping"]}
+    response = await client.put(f"/api/v1/services/{db_service.uuid}", json={"data": data})
+    assert response.status_code == 202, response.text
+    assert response.json()["data"]["allowed_events"] == ["push", "pull_request"]
+    cached = await get_service_cache().get(db_service.uuid)
+    assert cached is not None
+    assert cached.accepts_event("push")
+    assert not cached.accepts_event("status")
+    assert not cached.accepts_event("ping")
+
+    # Other changes keep the filters
+    response = await client.put(
+        f"/api/v1/services/{db_service.uuid}", json={"data": {"desc": "new description"}}
+    )
+    assert response.status_code == 202, response.text
+    assert response.json()["data"]["denied_events"] == ["ping"]
+
+    response = await client.put(
+        f"/api/v1/services/{db_service.uuid}", json={"data": {"allowed_events": None}}
+    )
+    assert response.status_code == 202, response.text
+    await db_session.refresh(db_service)
+    assert db_service.allowed_events is None
+    assert db_service.denied_events == ["ping"]
+    cached = await get_service_cache().get(db_service.uuid)
+    assert cached is not None
+    assert cached.accepts_event("status")
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_service_update_routing_rules(
+    client: AsyncClient,
+    authenticated: mock.MagicMock,
+    db_service: Service,
+    db_session: AsyncSession,
+) -> None:
+    """
+    Setting the routing rules of an existing service
+    """
+    rules = [{"repository": "fedora-infra/*", "ref": ["refs/heads/main", "refs/tags/*"]}]
+    response = await client.put(
+        f"/api/v1/services/{db_service.uuid}", json={"data": {"routing_rules": rules}}
+    )
+    assert response.status_code == 202, response.text
+    assert response.json()["data"]["routing_rules"] == [{**rules[0], "action": None}]
+    await db_session.refresh(db_service)
+    assert db_service.routing_rules == rules
+    cached = await get_service_cache().get(db_service.uuid)
+    assert cached is not None
+    assert cached.routing_rules is not None
+    assert cached.routing_rules.match(
+        {"repository": {"full_name": "fedora-infra/anitya"}, "ref": "refs/heads/main"}
+    )
+
+    response = await client.put(
+        f"/api/v1/services/{db_service.uuid}",
+        json={"data": {"routing_rules": [{"branch": "main"}]}},
+    )
+    assert response.status_code == 422, response.text
+
+    response = await client.put(
+        f"/api/v1/services/{db_service.uuid}", json={"data": {"routing_rules": None}}
+    )
+    assert response.status_code == 202, response.text
+    await db_session.refresh(db_service)
+    assert db_service.routing_rules is None
+
+
+@pytest.mark.parametrize("db_service", ["github"], indirect=["db_service"])
+async def test_service_update_pruning_profiles(
+    client: AsyncClient,
+    authenticated: mock.MagicMock,
+    db_service: Service,
+    db_session: AsyncSession,
+) -> None:
+    """
+    Setting the pruning profiles of an existing service
+    """
+    profiles = {"*": ["sender"], "push": ["commits.author.email"]}
+    response = await client.put(
+        f"/api/v1/services/{db_service.uuid}", json={"data": {"pruning_profiles": profiles}}
+    )
+    assert response.status_code == 202, response.text
+    assert response.json()["data"]["pruning_profiles"] == profiles
+    cached = await get_service_cache().get(db_service.uuid)
+    assert cached is not None
+    assert cached.pruning_profiles is not None
+    body = {"sender": {"login": "dummy"}, "ref": "refs/heads/main"}
+    cached.pruning_profiles.get("push").prune(body)
+    assert body == {"ref": "refs/heads/main"}
+
+    response = await client.put(
+        f"/api/v1/services/{db_service.uuid}",
+        json={"data": {"pruning_profiles": {"push": ["repository.**"]}}},
+    )
+    assert response.status_code == 422, response.text
+
+    response = await client.put(
+        f"/api/v1/services/{db_service.uuid}", json={"data": {"pruning_profiles": {}}}
+    )
+    assert response.status_code == 202, response.text
+    await db_session.refresh(db_service)
+    assert db_service.pruning_profiles == {}
 
 
 @pytest.mark.parametrize(
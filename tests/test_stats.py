@@ -0,0 +1,37 @@
+from unittest import mock
+
+from httpx import AsyncClient
+
+from webhook_to_fedora_messaging.fasjson import get_fasjson
+from webhook_to_fedora_messaging.models import User
+
+
+async def test_caches_stats(client: AsyncClient, admin: User) -> None:
+    """
+    Showing the hit counts of the caches
+    """
+    get_fasjson.cache_clear()
+    get_fasjson().cache.stats["memory"].hits = 3
+    get_fasjson().cache.stats["memory"].misses = 1
+    response = await client.get("/api/v1/stats/caches")
+    assert response.status_code == 200, response.text
+    assert response.json() == {
+        "data": {
+            "fasjson": {
+                "memory": {"hits": 3, "misses": 1, "hit_ratio": 0.75},
+                "disk": {"hits": 0, "misses": 0, "hit_ratio": 0.0},
+                "shared": {"hits": 0, "misses": 0, "hit_ratio": 0.0},
+            }
+        }
+    }
+    get_fasjson.cache_clear()
+
+
+async def test_caches_stats_not_admin(
+    client: AsyncClient, db_user: User, authenticated: mock.MagicMock
+) -> None:
+    """
+    Showing the hit counts of the caches without being an administrator
+    """
+    response = await client.get("/api/v1/stats/caches")
+    assert response.status_code == 403, response.text
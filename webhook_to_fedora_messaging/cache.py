@@ -1,5 +1,14 @@
+import asyncio
+import json
 import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Generic, overload, TypeVar
 
+import aiosqlite
 from cashews import cache
 
 from .config import get_config
@@ -7,8 +16,258 @@ from .config import get_config
 
 log = logging.getLogger(__name__)
 
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+D = TypeVar("D")
+
 
 def configure_cache() -> None:
     config = get_config()
     args = config.cache.setup_args or {}
     cache.setup(config.cache.url, **args)
+
+
+class LRUCache(Generic[K, V]):
+    """A bounded in-process mapping whose entries expire after some time."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @overload
+    def get(self, key: K) -> V | None: ...
+
+    @overload
+    def get(self, key: K, default: D) -> V | D: ...
+
+    def get(self, key: K, default: Any = None) -> Any:
+        try:
+            expires_at, value = self._data[key]
+        except KeyError:
+            return default
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class SingleFlight(Generic[K, V]):
+    """Merge concurrent calls for the same key into a single one.
+
+    The call runs in its own task, so it is not interrupted if the caller that started it is
+    canceled while others are still waiting for the result.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[K, asyncio.Future[V]] = {}
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._calls
+
+    async def do(self, key: K, function: Callable[[], Awaitable[V]]) -> V:
+        return await asyncio.shield(self.start(key, function))
+
+    def start(self, key: K, function: Callable[[], Awaitable[V]]) -> asyncio.Future[V]:
+        """Start the call in the background, unless it is already running."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return task
+
+    def _forget(self, key: K, task: asyncio.Future[V]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Don't warn about unretrieved exceptions if every caller was canceled
+            task.exception()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class SQLiteCache:
+    """A cache of JSON values in an SQLite file.
+
+    The file can be shared by several processes on the same host, and it is kept across restarts.
+    """
+
+    # Expired entries are removed once every so many writes
+    PURGE_INTERVAL = 1000
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._connection: aiosqlite.Connection | None = None
+        self._connecting = asyncio.Lock()
+        self._writes = 0
+
+    async def _connect(self) -> aiosqlite.Connection:
+        async with self._connecting:
+            if self._connection is None:
+                connection = await aiosqlite.connect(self.path, timeout=5)
+                # Readers don't block the writer in the other processes
+                await connection.execute("PRAGMA journal_mode=WAL")
+                await connection.execute(
+                    "CREATE TABLE IF NOT EXISTS cache "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                await connection.commit()
+                self._connection = connection
+        return self._connection
+
+    async def get(self, key: str) -> tuple[Any, float] | None:
+        """Return the value and the number of seconds until it expires."""
+        connection = self._connection or await self._connect()
+        now = time.time()
+        async with connection.execute(
+            "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, now)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1] - now
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        connection = self._connection or await self._connect()
+        now = time.time()
+        await connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), now + ttl),
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_INTERVAL == 0:
+            await connection.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        await connection.commit()
+
+    async def clear(self) -> None:
+        connection = self._connection or await self._connect()
+        await connection.execute("DELETE FROM cache")
+        await connection.commit()
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+class TieredCache:
+    """An in-process cache in front of an optional SQLite cache and of the optional cashews cache,
+    with hit counts for each of them.
+
+    The SQLite cache is shared by the workers of a host, the cashews cache (``cache.url``) can be
+    shared by several hosts. They are only fallbacks: their errors are logged and count as misses.
+    """
+
+    def __init__(
+        self, maxsize: int, path: Path | None = None, shared: bool = False, prefix: str = ""
+    ) -> None:
+        # The entries always have their own TTL
+        self.memory: LRUCache[str, Any] = LRUCache(maxsize, ttl=0)
+        self.disk = None if path is None else SQLiteCache(path)
+        self.shared = shared
+        self.prefix = prefix
+        self.stats = {"memory": CacheStats(), "disk": CacheStats(), "shared": CacheStats()}
+
+    async def get(self, key: str) -> Any:
+        value = self.memory.get(key)
+        if value is not None:
+            self.stats["memory"].hits += 1
+            return value
+        self.stats["memory"].misses += 1
+        found = await self._get_from_disk(key)
+        if found is None:
+            found = await self._get_from_shared(key)
+            if found is not None:
+                await self._set_on_disk(key, *found)
+        if found is None:
+            return None
+        value, ttl = found
+        self.memory.set(key, value, ttl)
+        return value
+
+    async def _get_from_disk(self, key: str) -> tuple[Any, float] | None:
+        if self.disk is None:
+            return None
+        try:
+            found = await self.disk.get(key)
+        except Exception:
+            log.warning(
+                "Could not read %r from the cache in %s", key, self.disk.path, exc_info=True
+            )
+            found = None
+        if found is None:
+            self.stats["disk"].misses += 1
+        else:
+            self.stats["disk"].hits += 1
+        return found
+
+    async def _get_from_shared(self, key: str) -> tuple[Any, float] | None:
+        if not self.shared:
+            return None
+        try:
+            found = await cache.get(f"{self.prefix}{key}")
+        except Exception:
+            log.warning("Could not read %r from the shared cache", key, exc_info=True)
+            found = None
+        if found is None:
+            self.stats["shared"].misses += 1
+            return None
+        self.stats["shared"].hits += 1
+        value, expires_at = found
+        return value, expires_at - time.time()
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self.memory.set(key, value, ttl)
+        await self._set_on_disk(key, value, ttl)
+        if not self.shared:
+            return
+        try:
+            await cache.set(f"{self.prefix}{key}", (value, time.time() + ttl), expire=ttl)
+        except Exception:
+            log.warning("Could not write %r to the shared cache", key, exc_info=True)
+
+    async def _set_on_disk(self, key: str, value: Any, ttl: float) -> None:
+        if self.disk is None:
+            return
+        try:
+            await self.disk.set(key, value, ttl)
+        except Exception:
+            log.warning("Could not write %r to the cache in %s", key, self.disk.path, exc_info=True)
+
+    async def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            await self.disk.clear()
+        if self.shared:
+            await cache.delete_match(f"{self.prefix}*")
+
+    async def close(self) -> None:
+        if self.disk is not None:
+            await self.disk.close()
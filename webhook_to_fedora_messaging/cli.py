@@ -2,7 +2,7 @@ import logging
 import logging.config
 import os
 from asyncio import run
-from typing import Optional
+from typing import Optional, TextIO
 
 import click
 import yaml
@@ -12,6 +12,8 @@ from . import __version__
 from .config import get_config, set_config_file
 from .crud import create_service
 from .database import get_db_manager, setup_database, with_db_session
+from .fasjson import get_fasjson
+from .identities import sync_github_identities, sync_identities
 
 
 logger = logging.getLogger(__name__)
@@ -64,3 +66,37 @@ def create(service: str, service_type: str, owner: str, description: Optional[st
             )
 
     run(_main())
+
+
+@main.command(name="sync-identities", help="Store the GitHub usernames of the FAS users locally")
+@click.option("--page-size", type=click.IntRange(1, 40), default=40, show_default=True)
+def sync_github(page_size: int) -> None:
+    result = run(sync_github_identities(get_fasjson(), page_size=page_size))
+    click.echo(
+        f"GitHub identities: {result.added} added, {result.updated} updated, "
+        f"{result.removed} removed, {result.conflicts} conflicting"
+    )
+
+
+@main.command(
+    name="import-identities",
+    help=(
+        "Replace the stored identities of a forge with the ones in a YAML file, "
+        "mapping the forge usernames to the FAS usernames"
+    ),
+)
+@click.argument("forge", type=click.Choice(["github", "forgejo"]))
+@click.argument("path", type=click.File())
+def import_identities(forge: str, path: TextIO) -> None:
+    mapping = yaml.safe_load(path) or {}
+    if not isinstance(mapping, dict):
+        raise click.ClickException("The file must contain a mapping")
+    identities = {
+        str(forge_username).lower(): str(fas_username)
+        for forge_username, fas_username in mapping.items()
+    }
+    result = run(sync_identities(forge, identities))
+    click.echo(
+        f"{forge} identities: {result.added} added, {result.updated} updated, "
+        f"{result.removed} removed"
+    )
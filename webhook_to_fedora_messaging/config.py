@@ -6,7 +6,7 @@ import os
 from functools import cache
 from pathlib import Path
 from secrets import token_urlsafe
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseModel, DirectoryPath, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -51,6 +51,89 @@ class OIDCModel(BaseModel):
 class CacheModel(BaseModel):
     url: str = "mem://"
     setup_args: dict[str, Any] | None = None
+    # In-process cache of the services used by the webhooks. Each worker has its own, so changes
+    # made through another worker are only seen when the entry expires (in seconds).
+    services_size: int = 1024
+    services_ttl: float = 60.0
+
+
+class OutboxModel(BaseModel):
+    enabled: bool = False
+    batch_size: int = 50
+    # Seconds
+    poll_interval: float = 1.0
+    max_backoff: float = 300.0
+    max_attempts: int = 20
+    retention: float = 86400.0
+
+
+class WebhooksModel(BaseModel):
+    # Payloads larger than this (in bytes), from their Content-Length or from the size read so
+    # far, have their signature computed in a worker thread, in batches of this size
+    hmac_offload_threshold: int = 256 * 1024
+    # Larger payloads are rejected, services can lower it (in bytes). GitHub caps its payloads
+    # at 25 MB.
+    max_body_size: int = 25 * 1024 * 1024
+    # Redelivered webhooks are answered with the message sent for their first delivery, if it
+    # was sent less than `deliveries_ttl` seconds ago. Each worker remembers the last
+    # `deliveries_size` deliveries, and they are shared through the cache with
+    # `deliveries_shared` (when it is not in memory).
+    deliveries_size: int = 10000
+    deliveries_ttl: float = 3 * 86400.0
+    deliveries_shared: bool = False
+    # Send only once the identical payloads that several services of the same forge receive
+    # within this many seconds, like with an organization and a repository webhook. The
+    # duplicates are counted as suppressed for their service. Disabled when unset.
+    duplicates_window: float | None = None
+    # Headers kept in the messages for each service type, instead of the event, delivery and hook
+    # headers. Those that the message schema requires are always kept, "*" keeps all of them.
+    header_allowlists: dict[str, list[str]] = {}
+    # Remove the key paths of the pruning profiles from the payloads, set to false to publish the
+    # full payloads of all the services
+    prune_payloads: bool = True
+    # Publish the payloads that were not pruned as they were received, instead of encoding them
+    # again
+    raw_body_passthrough: bool = True
+
+
+class HTTPClientModel(BaseModel):
+    # Seconds
+    timeout: float = 5.0
+    connect_timeout: float = 5.0
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 60.0
+    # Requires the h2 package (the http2 extra of httpx)
+    http2: bool = False
+
+
+class FASJSONModel(BaseModel):
+    # Seconds to wait for the agent's FAS username before sending the message without it. The
+    # lookup goes on in the background to fill the cache. Wait as long as needed when unset.
+    agent_timeout: float | None = None
+    # Look up the missing agents again before publishing the messages from the outbox
+    attach_agent_on_publish: bool = False
+    # Search results are kept in each worker, and in an SQLite file that the workers of the host
+    # share and that is kept across restarts. Only in the workers when unset.
+    cache_size: int = 4096
+    cache_path: Path | None = None
+    # Also keep the search results in the cashews cache (`cache.url`), that several hosts can
+    # share. By default, when it is not in memory.
+    cache_shared: bool | None = None
+    client: HTTPClientModel = HTTPClientModel()
+
+
+class IdentitiesModel(BaseModel):
+    # Where to find the FAS username of the Forgejo senders: in the identities stored locally, or
+    # in FASJSON (which does not know them yet).
+    forgejo_resolver: Literal["local", "fasjson"] = "local"
+    # Seconds between checks for changes in the stored identities
+    reload_interval: float = 60.0
+
+
+class CountersModel(BaseModel):
+    # Seconds between writes of the services counters to the database
+    flush_interval: float = 10.0
 
 
 def url_no_trailing_slash(url: str) -> str:
@@ -62,10 +145,15 @@ class Config(BaseSettings):
 
     database: DBModel = DBModel()
     fasjson_url: str = "https://fasjson.fedoraproject.org"
+    fasjson: FASJSONModel = FASJSONModel()
+    identities: IdentitiesModel = IdentitiesModel()
     datagrepper_url: str = "https://apps.fedoraproject.org/datagrepper"
     logging_config: Path = Path("/etc/webhook-to-fedora-messaging/logging.yaml")
     oidc: OIDCModel = OIDCModel()
     cache: CacheModel = CacheModel()
+    outbox: OutboxModel = OutboxModel()
+    counters: CountersModel = CountersModel()
+    webhooks: WebhooksModel = WebhooksModel()
     # It's fine if it changes on each startup: it's only used to temporarily store auth sessions
     session_secret: str = token_urlsafe(42)
 
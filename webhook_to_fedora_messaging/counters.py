@@ -0,0 +1,93 @@
+"""
+Services counters.
+
+The counters are incremented in memory by the webhook handlers and periodically written to the
+database with atomic ``UPDATE`` statements, instead of updating the service row on each request.
+"""
+
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from contextlib import suppress
+from datetime import datetime, UTC
+from functools import cache
+
+from sqlalchemy import update
+
+from .config import get_config
+from .database import with_db_session
+from .models import Service
+
+
+log = logging.getLogger(__name__)
+
+
+class ServiceCounters:
+    """Count events for each service and write the counts to the database in batches."""
+
+    def __init__(self, flush_interval: float) -> None:
+        self.flush_interval = flush_interval
+        self._pending: defaultdict[int, Counter[str]] = defaultdict(Counter)
+        self._last_sent: dict[int, datetime] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    def increment(self, service_id: int, counter: str = "sent") -> None:
+        """Increment one of the service's counters, by the name of its column."""
+        self._pending[service_id][counter] += 1
+        if counter == "sent":
+            self._last_sent[service_id] = datetime.now(tz=UTC)
+
+    def pending(self, service_id: int) -> Counter[str]:
+        """The counts that have not been written to the database yet."""
+        return self._pending.get(service_id, Counter())
+
+    async def flush(self) -> None:
+        # Swap the counts before writing them so increments made meanwhile are not lost.
+        pending, self._pending = self._pending, defaultdict(Counter)
+        last_sent, self._last_sent = self._last_sent, {}
+        if not pending:
+            return
+        try:
+            async with with_db_session() as session:
+                for service_id, counts in pending.items():
+                    values = {
+                        name: getattr(Service, name) + count for name, count in counts.items()
+                    }
+                    if service_id in last_sent:
+                        values["last_sent_at"] = last_sent[service_id]
+                    await session.execute(
+                        update(Service).where(Service.id == service_id).values(**values)
+                    )
+        except Exception:
+            # Keep the counts for the next flush
+            for service_id, counts in pending.items():
+                self._pending[service_id].update(counts)
+            for service_id, date in last_sent.items():
+                self._last_sent.setdefault(service_id, date)
+            raise
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="service-counters")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("Could not write the services counters")
+
+
+@cache
+def get_service_counters() -> ServiceCounters:
+    return ServiceCounters(flush_interval=get_config().counters.flush_interval)
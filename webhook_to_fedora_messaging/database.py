@@ -8,11 +8,11 @@ Use sqlalchemy-helpers.
 Import the functions we will use in the main code and in migrations.
 """
 
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, AsyncIterator
 from contextlib import asynccontextmanager
 from functools import cache
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 from sqlalchemy_helpers.aio import (
     AsyncDatabaseManager,
     Base,
@@ -33,6 +33,7 @@ __all__ = (
     "setup_database",
     "update_or_create",
     "with_db_session",
+    "with_readonly_connection",
 )
 
 
@@ -57,3 +58,18 @@ async def get_session() -> AsyncGenerator[AsyncSession]:
 
 
 with_db_session = asynccontextmanager(get_session)
+
+
+@asynccontextmanager
+async def with_readonly_connection() -> AsyncIterator[AsyncConnection]:
+    """
+    A pooled connection for the read-only queries on the hot paths.
+
+    There is no session, and no transaction to begin and commit around the queries.
+    """
+    async with get_db_manager().engine.connect() as connection:
+        if connection.dialect.name != "sqlite":
+            # SQLite doesn't begin transactions for reads, and switching its connections to
+            # autocommit and back is slower than the queries themselves.
+            await connection.execution_options(isolation_level="AUTOCOMMIT")
+        yield connection
@@ -0,0 +1,100 @@
+"""
+Recent webhook deliveries.
+
+GitHub and Forgejo send a webhook again with the same delivery ID when it timed out, or when it
+is redelivered manually. The message sent for each delivery is remembered for a while, so that
+its redeliveries are answered with it instead of sending it again.
+"""
+
+import logging
+from collections.abc import Awaitable, Callable
+from functools import cache, partial
+
+from cashews import cache as shared_cache
+
+from .cache import LRUCache, SingleFlight
+from .config import get_config
+
+
+log = logging.getLogger(__name__)
+
+
+class DeliveryStore:
+    """Remember the ID of the message sent for the recent deliveries of each service.
+
+    The deliveries are kept in the worker, and optionally in the cashews cache to share them with
+    the other workers.
+    """
+
+    def __init__(
+        self, maxsize: int, ttl: float, shared: bool = False, name: str = "delivery"
+    ) -> None:
+        self.ttl = ttl
+        self.shared = shared
+        self.name = name
+        self._recent: LRUCache[str, str] = LRUCache(maxsize, ttl)
+        self._sending: SingleFlight[str, str | None] = SingleFlight()
+
+    async def send_once(
+        self, service_uuid: str, delivery_id: str, send: Callable[[], Awaitable[str | None]]
+    ) -> str | None:
+        """Send the delivery's message unless it was already sent, and return its ID.
+
+        Nothing is remembered when no message was sent.
+        """
+        key = f"{service_uuid}:{delivery_id}"
+        message_id = await self._get(key)
+        if message_id is not None:
+            log.info("%s %s was already sent as message %s", self.name.title(), key, message_id)
+            return message_id
+        # Concurrent redeliveries wait for the first one
+        return await self._sending.do(key, partial(self._send, key, send))
+
+    async def _send(self, key: str, send: Callable[[], Awaitable[str | None]]) -> str | None:
+        message_id = await send()
+        if message_id is None:
+            return None
+        self._recent.set(key, message_id)
+        if self.shared:
+            try:
+                await shared_cache.set(f"{self.name}:{key}", message_id, expire=self.ttl)
+            except Exception:
+                log.warning("Could not store %s %s in the cache", self.name, key, exc_info=True)
+        return message_id
+
+    async def _get(self, key: str) -> str | None:
+        message_id = self._recent.get(key)
+        if message_id is not None or not self.shared:
+            return message_id
+        try:
+            message_id = await shared_cache.get(f"{self.name}:{key}")
+        except Exception:
+            log.warning("Could not look up %s %s in the cache", self.name, key, exc_info=True)
+            return None
+        if message_id is not None:
+            self._recent.set(key, message_id)
+        return message_id
+
+
+@cache
+def get_delivery_store() -> DeliveryStore:
+    config = get_config().webhooks
+    return DeliveryStore(
+        maxsize=config.deliveries_size,
+        ttl=config.deliveries_ttl,
+        shared=config.deliveries_shared,
+    )
+
+
+@cache
+def get_duplicate_store() -> DeliveryStore | None:
+    """The payloads recently sent for each forge, when the duplicates are suppressed."""
+    config = get_config().webhooks
+    if config.duplicates_window is None:
+        return None
+    return DeliveryStore(
+        maxsize=config.deliveries_size,
+        ttl=config.duplicates_window,
+        shared=config.deliveries_shared,
+        name="payload",
+    )
@@ -0,0 +1,101 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.status import HTTP_200_OK, HTTP_202_ACCEPTED, HTTP_204_NO_CONTENT, HTTP_404_NOT_FOUND
+
+from ..auth import current_user
+from ..database import get_session
+from ..identities import get_identity_index
+from ..models import ForgeIdentity, User
+from .models.identity import IdentityRequest, IdentityResult
+from .models.service import ServiceType
+from .util import admin_user, SerializedModel
+
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/identities")
+
+
+async def _get_identity(
+    session: AsyncSession, forge: ServiceType, forge_username: str
+) -> ForgeIdentity | None:
+    query = select(ForgeIdentity).filter_by(
+        forge=forge.value, forge_username=forge_username.lower()
+    )
+    return await session.scalar(query)
+
+
+@router.get(
+    "/{forge}/{forge_username}",
+    status_code=HTTP_200_OK,
+    response_model=IdentityResult,
+    tags=["identities"],
+    dependencies=[Depends(current_user)],
+)
+async def get_identity(
+    forge: ServiceType,
+    forge_username: str,
+    session: AsyncSession = Depends(get_session),  # noqa : B008
+) -> SerializedModel:
+    """
+    Return the FAS username of an account on a forge
+    """
+    identity = await _get_identity(session, forge, forge_username)
+    if identity is None:
+        raise HTTPException(HTTP_404_NOT_FOUND, f"No identity was found for {forge_username!r}")
+    return {"data": identity}
+
+
+@router.put(
+    "/{forge}/{forge_username}",
+    status_code=HTTP_202_ACCEPTED,
+    response_model=IdentityResult,
+    tags=["identities"],
+)
+async def set_identity(
+    forge: ServiceType,
+    forge_username: str,
+    body: IdentityRequest,
+    session: AsyncSession = Depends(get_session),  # noqa : B008
+    user: User = Depends(admin_user),  # noqa : B008
+) -> SerializedModel:
+    """
+    Set the FAS username of an account on a forge
+    """
+    identity = await _get_identity(session, forge, forge_username)
+    if identity is None:
+        identity = ForgeIdentity(forge=forge.value, forge_username=forge_username.lower())
+        session.add(identity)
+    identity.fas_username = body.data.fas_username
+    await session.commit()
+    logger.info(
+        "%s set the FAS username of %s user %r to %r",
+        user.name,
+        forge.value,
+        forge_username,
+        body.data.fas_username,
+    )
+    # Rebuild this worker's copy right away, the others will notice the change
+    await get_identity_index(forge.value).refresh()
+    return {"data": identity}
+
+
+@router.delete("/{forge}/{forge_username}", status_code=HTTP_204_NO_CONTENT, tags=["identities"])
+async def delete_identity(
+    forge: ServiceType,
+    forge_username: str,
+    session: AsyncSession = Depends(get_session),  # noqa : B008
+    user: User = Depends(admin_user),  # noqa : B008
+) -> None:
+    """
+    Forget the FAS username of an account on a forge
+    """
+    identity = await _get_identity(session, forge, forge_username)
+    if identity is None:
+        raise HTTPException(HTTP_404_NOT_FOUND, f"No identity was found for {forge_username!r}")
+    await session.delete(identity)
+    await session.commit()
+    logger.info("%s removed the %s user %r", user.name, forge.value, forge_username)
+    await get_identity_index(forge.value).refresh()
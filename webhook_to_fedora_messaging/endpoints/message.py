@@ -1,43 +1,186 @@
+import hashlib
 import logging
-from typing import Any
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from functools import cache, partial
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fedora_messaging import exceptions as fm_exceptions
-from starlette.status import HTTP_202_ACCEPTED, HTTP_400_BAD_REQUEST, HTTP_502_BAD_GATEWAY
+from starlette.status import (
+    HTTP_202_ACCEPTED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+    HTTP_502_BAD_GATEWAY,
+)
 
-from ..exceptions import SignatureMatchError
-from ..models import Service
+from ..config import get_config
+from ..counters import get_service_counters
+from ..database import with_db_session
+from ..deliveries import DeliveryStore, get_delivery_store, get_duplicate_store
+from ..exceptions import PayloadDecodeError, PayloadTooLargeError, SignatureMatchError
+from ..outbox import enqueue, get_outbox_publisher
 from ..publishing import publish
+from ..service_cache import ServiceSnapshot
 from .models.message import MessageResult
-from .parser import parser
-from .util import return_service_from_uuid, SerializedModel
+from .parser import get_parser
+from .parser.base import BaseParser, BodyData, HeadersDict
+from .util import service_snapshot_from_uuid
 
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/messages")
 
+# The payload is read and decoded by the parser, once its signature has been verified. Document
+# it as FastAPI would if it were declared as a handler argument.
+REQUEST_BODY_SCHEMA = {
+    "requestBody": {
+        "content": {
+            "application/json": {
+                "schema": {"additionalProperties": True, "title": "Body", "type": "object"}
+            }
+        },
+        "required": True,
+    }
+}
+
+
+class MessageResponses:
+    """
+    The responses of the message endpoint, serialized once from a template.
+
+    They are the same as FastAPI would serialize from the response model, without validating
+    the model and building the datagrepper URL for each message.
+    """
+
+    # Message IDs are UUIDs, they need no escaping in JSON or in URLs
+    PLACEHOLDER = "00000000-0000-0000-0000-000000000000"
+
+    def __init__(self) -> None:
+        self._parts = self._serialize(self.PLACEHOLDER).split(self.PLACEHOLDER.encode())
+        self._no_message = self._serialize(None)
+
+    @staticmethod
+    def _serialize(message_id: str | None) -> bytes:
+        result = MessageResult.model_validate({"data": {"message_id": message_id}})
+        return result.model_dump_json().encode("utf-8")
+
+    def render(self, message_id: str | None) -> Response:
+        content = self._no_message if message_id is None else message_id.encode().join(self._parts)
+        return Response(content, status_code=HTTP_202_ACCEPTED, media_type="application/json")
+
+
+@cache
+def get_message_responses() -> MessageResponses:
+    return MessageResponses()
+
 
 @router.post(
     "/{uuid}",
     status_code=HTTP_202_ACCEPTED,
     response_model=MessageResult,
     tags=["messages"],
+    openapi_extra=REQUEST_BODY_SCHEMA,
 )
 async def create_message(
-    body: dict[str, Any],
     request: Request,
-    service: Service = Depends(return_service_from_uuid),  # noqa : B008
-) -> SerializedModel:
+    service: ServiceSnapshot = Depends(service_snapshot_from_uuid),  # noqa : B008
+) -> Response:
     """
     Create a message with the requested attributes
     """
+    with _parsing_errors():
+        parser = get_parser(service, request)
+    event = parser.get_event()
+    if event is not None and not service.accepts_event(event):
+        # Don't even read the payload
+        logger.debug("Ignoring %s event for service %s", event, service.name)
+        return get_message_responses().render(None)
+    with _parsing_errors():
+        headers, data = await parser.get_headers_and_data()
+    send = partial(_send_message, service, parser, headers, data)
+    duplicates = get_duplicate_store()
+    if duplicates is not None:
+        send = partial(
+            _send_unique_payload, duplicates, service, data, parser.pruning_fingerprint, send
+        )
+    delivery_id = parser.get_delivery_id(headers)
+    if delivery_id is None:
+        message_id = await send()
+    else:
+        message_id = await get_delivery_store().send_once(service.uuid, delivery_id, send)
+    return get_message_responses().render(message_id)
+
+
+async def _send_unique_payload(
+    duplicates: DeliveryStore,
+    service: ServiceSnapshot,
+    data: BodyData,
+    pruning_fingerprint: str,
+    send: Callable[[], Awaitable[str | None]],
+) -> str | None:
+    """
+    Don't send the payloads that another service of the same forge just sent.
+
+    The services that prune the payloads differently send different messages, they don't
+    suppress each other's.
+    """
+    sent = False
+
+    async def _send() -> str | None:
+        nonlocal sent
+        sent = True
+        return await send()
+
+    payload_id = f"{hashlib.sha256(data).hexdigest()}:{pruning_fingerprint}"
+    message_id = await duplicates.send_once(service.type, payload_id, _send)
+    while message_id is None and not sent:
+        # The other service dropped it, it may match the routing rules of this one. Nothing was
+        # remembered, so try again: this service sends it, unless another service that was also
+        # waiting for the payload started sending it first.
+        message_id = await duplicates.send_once(service.type, payload_id, _send)
+    if sent:
+        return message_id
+    get_service_counters().increment(service.id, "suppressed")
+    return message_id
+
+
+@contextmanager
+def _parsing_errors() -> Iterator[None]:
     try:
-        message = await parser(service, request)
-    except (SignatureMatchError, ValueError, KeyError) as expt:
-        raise HTTPException(
-            HTTP_400_BAD_REQUEST, f"Message could not be dispatched - {expt}"
-        ) from expt
+        yield
+    except Exception as expt:
+        logger.exception("Message could not be parsed")
+        if isinstance(expt, PayloadTooLargeError):
+            raise HTTPException(HTTP_413_REQUEST_ENTITY_TOO_LARGE, str(expt)) from expt
+        if isinstance(expt, PayloadDecodeError):
+            raise HTTPException(HTTP_422_UNPROCESSABLE_ENTITY, str(expt)) from expt
+        if isinstance(expt, (SignatureMatchError, ValueError, KeyError)):
+            raise HTTPException(
+                HTTP_400_BAD_REQUEST, f"Message could not be dispatched - {expt}"
+            ) from expt
+        raise
+
+
+async def _send_message(
+    service: ServiceSnapshot, parser: BaseParser, headers: HeadersDict, data: BodyData
+) -> str | None:
+    with _parsing_errors():
+        message = await parser.build_message(headers, data)
+    if message is None:
+        logger.debug("The message does not match the routing rules of service %s", service.name)
+        get_service_counters().increment(service.id, "dropped")
+        return None
+
+    if get_config().outbox.enabled:
+        # Make sure the message is stored before acknowledging it, the publisher will take it
+        # from there.
+        async with with_db_session() as session:
+            await enqueue(session, message, service.id)
+        get_outbox_publisher().wake_up()
+        get_service_counters().increment(service.id)
+        return message.id
 
     try:
         await publish(message)
@@ -46,5 +189,5 @@ async def create_message(
             "Could not send message %s for service %s (%s)", message.id, service.name, service.id
         )
         raise HTTPException(HTTP_502_BAD_GATEWAY, f"Message could not be sent: {expt}") from expt
-    service.sent += 1
-    return {"data": {"message_id": message.id}}
+    get_service_counters().increment(service.id)
+    return message.id
@@ -0,0 +1,36 @@
+from abc import ABC
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+from .service import ServiceType
+
+
+class IdentityBase(BaseModel, ABC):
+    """
+    Base: Identity
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+    forge: ServiceType
+    forge_username: str
+    fas_username: str
+    updated_at: datetime
+
+
+class IdentityExternal(IdentityBase):
+    pass
+
+
+class IdentityRequestMain(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    fas_username: str
+
+
+class IdentityRequest(BaseModel):
+    data: IdentityRequestMain
+
+
+class IdentityResult(BaseModel):
+    data: IdentityExternal
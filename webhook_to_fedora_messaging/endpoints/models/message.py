@@ -25,6 +25,8 @@ class MessageExternal(MessageBase):
 
     @model_validator(mode="after")
     def build_url(self) -> Self:
+        if self.message_id is None:
+            return self
         base_url = get_config().datagrepper_url
         self.url = HttpUrl(f"{base_url}/v2/id?id={self.message_id}&is_raw=true&size=extra-large")
         return self
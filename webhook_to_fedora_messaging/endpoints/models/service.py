@@ -1,24 +1,48 @@
 from abc import ABC
 from datetime import datetime
 from enum import Enum
-from typing import Any, cast, Optional, Self
+from typing import Annotated, Any, cast, Optional, Self
 
 from pydantic import (
+    AfterValidator,
     BaseModel,
     ConfigDict,
     HttpUrl,
     model_validator,
+    PositiveInt,
     ValidationError,
     ValidationInfo,
 )
 from starlette.requests import Request
 
+from ...pruning import PruningProfiles
+
 
 class ServiceType(str, Enum):
     github = "github"
     forgejo = "forgejo"
 
 
+class RoutingRule(BaseModel):
+    """
+    Glob patterns that the messages must match, see the routing module
+    """
+
+    model_config = ConfigDict(extra="forbid")
+    repository: str | list[str] | None = None
+    ref: str | list[str] | None = None
+    action: str | list[str] | None = None
+
+
+def _check_pruning_profiles(profiles: dict[str, list[str]]) -> dict[str, list[str]]:
+    PruningProfiles(profiles)
+    return profiles
+
+
+# Key paths to remove from the payloads of each event type, see the pruning module
+PruningProfilesDict = Annotated[dict[str, list[str]], AfterValidator(_check_pruning_profiles)]
+
+
 class ServiceBase(BaseModel, ABC):
     """
     Base: Service
@@ -31,6 +55,13 @@ class ServiceBase(BaseModel, ABC):
     desc: str | None = None
     token: str
     creation_date: datetime
+    max_body_size: int | None = None
+    allowed_events: list[str] | None = None
+    denied_events: list[str] | None = None
+    routing_rules: list[RoutingRule] | None = None
+    pruning_profiles: dict[str, list[str]] | None = None
+    suppressed: int = 0
+    dropped: int = 0
 
 
 class ServiceExternal(ServiceBase):
@@ -66,6 +97,14 @@ class ServiceUpdateMain(BaseModel):
     type: Optional[str] = None
     desc: Optional[str] = None
     username: Optional[str] = None
+    # Set to null to remove the filters and limits below. The size limit can only be lower than
+    # the global one.
+    max_body_size: Optional[PositiveInt] = None
+    allowed_events: Optional[list[str]] = None
+    denied_events: Optional[list[str]] = None
+    routing_rules: Optional[list[RoutingRule]] = None
+    # Set to null to use the defaults of the service type, and to {} to keep the full payloads
+    pruning_profiles: Optional[PruningProfilesDict] = None
 
 
 class ServiceUpdate(BaseModel):
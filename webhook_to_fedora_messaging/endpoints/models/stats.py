@@ -0,0 +1,17 @@
+from pydantic import BaseModel, ConfigDict
+
+
+class CacheTierStats(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class CachesStats(BaseModel):
+    fasjson: dict[str, CacheTierStats]
+
+
+class CachesStatsResult(BaseModel):
+    data: CachesStats
@@ -3,26 +3,46 @@ import logging
 from fedora_messaging.api import Message
 from starlette.requests import Request
 
-from ...models import Service
+from ...config import get_config
+from ...pruning import NO_PRUNING
+from ...service_cache import ServiceSnapshot
+from .base import BaseParser
 from .forgejo import ForgejoParser
 from .github import GitHubParser
 
 
 logger = logging.getLogger(__name__)
 
+PARSERS: dict[str, type[BaseParser]] = {
+    "github": GitHubParser,
+    "forgejo": ForgejoParser,
+}
 
-async def parser(service: Service, request: Request) -> Message:
-    parsers = {
-        "github": GitHubParser,
-        "forgejo": ForgejoParser,
-    }
 
-    parser = parsers.get(service.type.lower())
+def get_parser(service: ServiceSnapshot, request: Request) -> BaseParser:
+    parser = PARSERS.get(service.type.lower())
     if not parser:
         raise ValueError(f"Unsupported service: {service.type}")
-
-    try:
-        return await parser(service.token, request).parse()
-    except Exception:
-        logger.exception("Message could not be parsed")
-        raise
+    config = get_config().webhooks
+    max_body_size = config.max_body_size
+    if service.max_body_size is not None:
+        # Services can lower the limit, not raise it
+        max_body_size = min(service.max_body_size, max_body_size)
+    return parser(
+        service.token,
+        request,
+        max_body_size=max_body_size,
+        routing_rules=service.routing_rules,
+        header_allowlist=config.header_allowlists.get(service.type.lower()),
+        pruning_profiles=service.pruning_profiles if config.prune_payloads else NO_PRUNING,
+    )
+
+
+async def get_agent(message: Message) -> str | None:
+    """
+    Look up the agent of a message that was built without it.
+    """
+    for parser in PARSERS.values():
+        if isinstance(message, parser.message_class):
+            return await parser.get_agent(message.body["body"])
+    return None
@@ -1,62 +1,352 @@
+import asyncio
+import codecs
 import hashlib
 import hmac
 import json
-from typing import Any, TypeAlias
+import logging
+from collections.abc import Callable, Collection
+from functools import cache, lru_cache
+from typing import Any, cast, TypeAlias
 
+from fastapi.concurrency import run_in_threadpool
 from fedora_messaging.api import Message
 from starlette.requests import Request
 
-from ...exceptions import SignatureMatchError
+from ...config import get_config
+from ...exceptions import PayloadDecodeError, PayloadTooLargeError, SignatureMatchError
+from ...pruning import PruningProfiles
+from ...routing import RoutingRules
 
 
+log = logging.getLogger(__name__)
+
 HeadersDict: TypeAlias = dict[str, str]
 Body: TypeAlias = dict[str, Any]
 BodyData: TypeAlias = bytes
 
 
+def _json_loads(data: BodyData) -> Any:
+    # Only accept UTF-8 without a BOM, like orjson: json.loads() would also accept the other
+    # encodings that JSON allows, and the payload could then not be passed through as it is
+    return json.loads(data.decode("utf-8"))
+
+
+def _get_json_loader() -> Callable[[BodyData], Any]:
+    try:
+        # Faster, and decodes bytes without building an intermediate string
+        import orjson
+    except ImportError:
+        return _json_loads
+    loads: Callable[[BodyData], Any] = orjson.loads
+    return loads
+
+
+json_loads = _get_json_loader()
+
+
+class RawBodyMessage(Message):
+    """
+    A message that is published with the payload as it was received.
+
+    The payload is already valid JSON, so it is not encoded again: only the rest of the message
+    body (the headers and the agent) goes through the serializer.
+    """
+
+    _raw_body: BodyData
+    _raw_source: Body
+
+    @property
+    def _encoded_body(self) -> bytes:
+        if self.body.get("body") is not self._raw_source:
+            # The payload was replaced since the message was built
+            return super()._encoded_body
+        envelope = json.dumps({k: v for k, v in self.body.items() if k != "body"})
+        if envelope == "{}":
+            return b'{"body": ' + self._raw_body + b"}"
+        return b'{"body": ' + self._raw_body + b", " + envelope[1:].encode("utf-8")
+
+
+_raw_body_classes: dict[type[Message], type[RawBodyMessage]] = {}
+
+
+def is_plain_utf8(data: BodyData) -> bool:
+    """
+    Whether the payload can be spliced into a message body, which is encoded in UTF-8.
+    """
+    if data.startswith(codecs.BOM_UTF8):
+        return False
+    if data.isascii():
+        return True
+    try:
+        data.decode("utf-8")
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def with_raw_body(message: Message, data: BodyData) -> RawBodyMessage:
+    """
+    Publish the message with the payload it was decoded from.
+
+    The class of the message is switched after it is built, so that its headers still refer to
+    its registered schema.
+    """
+    message_class = type(message)
+    if message_class not in _raw_body_classes:
+        _raw_body_classes[message_class] = type(
+            f"RawBody{message_class.__name__}", (RawBodyMessage, message_class), {}
+        )
+    message.__class__ = _raw_body_classes[message_class]
+    raw_message = cast(RawBodyMessage, message)
+    raw_message._raw_body = data
+    raw_message._raw_source = message.body["body"]
+    return raw_message
+
+
+# Keep a reference to the agent lookups that go on after their message was sent
+_background_lookups: set[asyncio.Task[str | None]] = set()
+
+
+def _lookup_done(task: asyncio.Task[str | None]) -> None:
+    _background_lookups.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.error("Could not look up the agent in the background", exc_info=task.exception())
+
+
+@lru_cache(maxsize=1024)
+def _get_keyed_hmac(token: str, algorithm: str) -> hmac.HMAC:
+    """
+    Prepare the HMAC state for a service's token once, it is copied for each payload.
+    """
+    return hmac.new(token.encode("utf-8"), digestmod=algorithm)
+
+
+class SignatureVerifier:
+    """
+    Compute the signature of a payload incrementally and compare it to the one in the request.
+    """
+
+    def __init__(self, token: str, sig_header: str, expected_size: int | None = None):
+        algorithm, self._signature = sig_header.split("=", 1)
+        if algorithm not in hashlib.algorithms_available:
+            raise SignatureMatchError(f"Unsupported algorithm: {algorithm}")
+        self._hash_object = _get_keyed_hmac(token, algorithm).copy()
+        self._offload_threshold = get_config().webhooks.hmac_offload_threshold
+        self._size = 0
+        self._offload = expected_size is not None and expected_size > self._offload_threshold
+        self._pending: list[BodyData] = []
+        self._pending_size = 0
+
+    async def update(self, data: BodyData) -> None:
+        """
+        Small payloads are hashed on the event loop as their chunks arrive.
+
+        Once a payload is known to be large, from its expected size or from the size read so far,
+        its chunks are hashed in a worker thread, in batches of the offload threshold, to avoid
+        blocking the event loop.
+        """
+        self._size += len(data)
+        if not self._offload and self._size <= self._offload_threshold:
+            self._hash_object.update(data)
+            return
+        self._offload = True
+        self._pending.append(data)
+        self._pending_size += len(data)
+        if self._pending_size >= self._offload_threshold:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._pending:
+            return
+        chunks, self._pending, self._pending_size = self._pending, [], 0
+        await run_in_threadpool(self._update_many, chunks)
+
+    def _update_many(self, chunks: list[BodyData]) -> None:
+        for chunk in chunks:
+            self._hash_object.update(chunk)
+
+    async def verify(self) -> None:
+        await self._flush()
+        if not hmac.compare_digest(self._hash_object.hexdigest(), self._signature):
+            raise SignatureMatchError("Message signature could not be matched")
+
+
 class BaseParser:
 
     message_class: type[Message] = Message
+    signature_header = "x-hub-signature-256"
+    event_header: str | None = None
+    # The same for all the attempts to deliver a webhook
+    delivery_header: str | None = None
+    # The headers kept in the messages (all of them when unset), in addition to those that the
+    # message schema requires
+    header_allowlist: frozenset[str] | None = None
+    # The key paths removed from the payloads of each event type, see the pruning module
+    pruning_profiles: dict[str, tuple[str, ...]] = {}
 
-    def __init__(self, token: str, request: Request):
+    def __init__(
+        self,
+        token: str,
+        request: Request,
+        max_body_size: int | None = None,
+        routing_rules: RoutingRules | None = None,
+        header_allowlist: Collection[str] | None = None,
+        pruning_profiles: PruningProfiles | None = None,
+    ):
         self._token = token
         self._request = request
+        self._max_body_size = max_body_size
+        self._routing_rules = routing_rules
+        self._kept_headers = self.get_kept_headers(header_allowlist)
+        if pruning_profiles is None:
+            pruning_profiles = self.get_default_pruning_profiles()
+        self._pruning_profiles = pruning_profiles
 
     async def get_headers_and_data(self) -> tuple[HeadersDict, bytes]:
+        """
+        Read the payload and verify its signature.
+
+        The payload is streamed: its signature is computed as the chunks arrive, and reading stops
+        as soon as it is larger than the allowed size.
+        """
         headers = {k.lower(): v for k, v in self._request.headers.items()}
-        if "x-hub-signature-256" not in headers:
+        if self.signature_header not in headers:
             raise KeyError("Signature not found")
-        data = await self._request.body()
-        return headers, data
+        content_length = self._check_content_length(headers)
+        verifier = None
+        if self._token:
+            verifier = SignatureVerifier(
+                self._token, headers[self.signature_header], expected_size=content_length
+            )
+        chunks = []
+        size = 0
+        async for chunk in self._request.stream():
+            size += len(chunk)
+            self._check_size(size)
+            if verifier is not None:
+                await verifier.update(chunk)
+            chunks.append(chunk)
+        if verifier is not None:
+            await verifier.verify()
+        return headers, b"".join(chunks)
 
-    async def validate(self, headers: HeadersDict, data: bytes) -> None:
-        raise NotImplementedError
+    def _check_content_length(self, headers: HeadersDict) -> int | None:
+        try:
+            content_length = int(headers["content-length"])
+        except (KeyError, ValueError):
+            # The size will be checked while reading
+            return None
+        self._check_size(content_length)
+        return content_length
+
+    def _check_size(self, size: int) -> None:
+        if self._max_body_size is not None and size > self._max_body_size:
+            raise PayloadTooLargeError(
+                f"The payload is larger than the allowed size ({self._max_body_size} bytes)"
+            )
+
+    @classmethod
+    def get_kept_headers(
+        cls, header_allowlist: Collection[str] | None = None
+    ) -> frozenset[str] | None:
+        """
+        The headers to keep in the messages, from the class' allowlist unless another one is given.
+        """
+        allowlist = cls.header_allowlist if header_allowlist is None else header_allowlist
+        if allowlist is None or "*" in allowlist:
+            return None
+        schema = cls.message_class.body_schema.get("properties", {}).get("headers", {})
+        return frozenset(header.lower() for header in allowlist) | frozenset(
+            schema.get("required", [])
+        )
+
+    @classmethod
+    @cache
+    def get_default_pruning_profiles(cls) -> PruningProfiles:
+        return PruningProfiles(cls.pruning_profiles)
+
+    @property
+    def pruning_fingerprint(self) -> str:
+        """
+        Identify the pruning profiles of the parser, the payloads are pruned the same way by the
+        parsers that have the same fingerprint.
+        """
+        return self._pruning_profiles.fingerprint
 
     def _get_topic(self, headers: HeadersDict, body: Body) -> str:
         raise NotImplementedError
 
-    async def _get_agent(self, body: Body) -> str | None: ...
+    @classmethod
+    async def get_agent(cls, body: Body) -> str | None: ...
 
-    def _validate_with_sig_header(self, sig_header: str, data: BodyData) -> None:
+    async def _get_agent_within_budget(self, body: Body) -> str | None:
         """
-        Verify the payload by validating its signature.
+        Don't wait for the agent longer than configured.
+
+        The lookup is not canceled when it takes too long, so that its result is cached for the
+        next messages.
         """
-        algorithm, signature = sig_header.split("=", 1)
+        timeout = get_config().fasjson.agent_timeout
+        if timeout is None:
+            return await self.get_agent(body)
+        task = asyncio.ensure_future(self.get_agent(body))
         try:
-            algo_function = getattr(hashlib, algorithm)
-        except AttributeError as e:
-            raise SignatureMatchError(f"Unsupported algorithm: {algorithm}") from e
-        hash_object = hmac.new(self._token.encode("utf-8"), msg=data, digestmod=algo_function)
-        if not hmac.compare_digest(hash_object.hexdigest(), signature):
-            raise SignatureMatchError("Message signature could not be matched")
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except TimeoutError:
+            log.info("The agent lookup took more than %s seconds, sending without it", timeout)
+            _background_lookups.add(task)
+            task.add_done_callback(_lookup_done)
+            return None
+
+    def _decode(self, data: BodyData) -> Body:
+        """
+        Decode the payload, once its signature has been verified.
+        """
+        try:
+            body = json_loads(data)
+        except ValueError as e:
+            raise PayloadDecodeError(f"Invalid JSON payload: {e}") from e
+        if not isinstance(body, dict):
+            raise PayloadDecodeError("The JSON payload must be an object")
+        return body
+
+    def get_event(self) -> str | None:
+        """
+        The event type, known before the payload is read.
+        """
+        if self.event_header is None:
+            return None
+        return self._request.headers.get(self.event_header)
 
-    async def parse(self) -> Message:
+    def get_delivery_id(self, headers: HeadersDict) -> str | None:
+        if self.delivery_header is None:
+            return None
+        return headers.get(self.delivery_header)
+
+    async def parse(self) -> Message | None:
         headers, data = await self.get_headers_and_data()
-        if self._token:
-            await self.validate(headers, data)
-        body = json.loads(data.decode("utf-8"))
+        return await self.build_message(headers, data)
+
+    async def build_message(self, headers: HeadersDict, data: BodyData) -> Message | None:
+        """
+        Build the message from the verified payload, unless the service's routing rules drop it.
+
+        The payload is pruned once the agent is known, with the profile of its event type. When
+        nothing was pruned and the payload is plain UTF-8, the message is published with the
+        payload as it was received.
+        """
+        body = self._decode(data)
+        if self._routing_rules is not None and not self._routing_rules.match(body):
+            return None
+        event = headers.get(self.event_header) if self.event_header is not None else None
+        if self._kept_headers is not None:
+            headers = {k: v for k, v in headers.items() if k in self._kept_headers}
         topic = self._get_topic(headers, body)
-        agent = await self._get_agent(body)
-        return self.message_class(
+        agent = await self._get_agent_within_budget(body)
+        pruned = self._pruning_profiles.get(event).prune(body)
+        message = self.message_class(
             topic=topic, body={"body": body, "headers": headers, "agent": agent}
         )
+        if not pruned and get_config().webhooks.raw_body_passthrough and is_plain_utf8(data):
+            message = with_raw_body(message, data)
+        return message
@@ -1,21 +1,45 @@
 from webhook_to_fedora_messaging_messages.forgejo import ForgejoMessageV1
 
+from ...config import get_config
 from ...fasjson import get_fasjson
-from .base import BaseParser, Body, BodyData, HeadersDict
+from ...identities import get_fas_username
+from .base import BaseParser, Body, HeadersDict
 
 
 class ForgejoParser(BaseParser):
 
     message_class = ForgejoMessageV1
-
-    async def validate(self, headers: HeadersDict, data: BodyData) -> None:
-        """
-        Verify that the payload was sent from ForgeJo by validating SHA256.
-        """
-        self._validate_with_sig_header(headers["x-hub-signature-256"], data)
+    event_header = "x-forgejo-event"
+    delivery_header = "x-forgejo-delivery"
+    header_allowlist = frozenset({"x-forgejo-event", "x-forgejo-delivery"})
+    # Mostly the API URLs, the messages only need the web pages
+    pruning_profiles = {
+        "*": (
+            "repository.*_url",
+            "repository.owner.*_url",
+            "organization.*_url",
+            "sender.*_url",
+            "pusher.*_url",
+            "!**.html_url",
+            "!**.avatar_url",
+            "!**.clone_url",
+            "!**.ssh_url",
+        ),
+        "pull_request": (
+            "pull_request.**.*_url",
+            "!pull_request.diff_url",
+            "!pull_request.patch_url",
+        ),
+        "issues": ("issue.**.*_url",),
+        "issue_comment": ("issue.**.*_url", "comment.**.*_url"),
+    }
 
     def _get_topic(self, headers: HeadersDict, body: Body) -> str:
         return f"forgejo.{headers['x-forgejo-event']}"
 
-    async def _get_agent(self, body: Body) -> str | None:
-        return await get_fasjson().get_username_from_forgejo(body["sender"]["login"])
+    @classmethod
+    async def get_agent(cls, body: Body) -> str | None:
+        username = body["sender"]["login"]
+        if get_config().identities.forgejo_resolver == "local":
+            return await get_fas_username("forgejo", username)
+        return await get_fasjson().get_username_from_forgejo(username)
@@ -1,21 +1,48 @@
 from webhook_to_fedora_messaging_messages.github import GitHubMessageV1
 
 from ...fasjson import get_fasjson
-from .base import BaseParser, Body, BodyData, HeadersDict
+from .base import BaseParser, Body, HeadersDict
 
 
 class GitHubParser(BaseParser):
 
     message_class = GitHubMessageV1
-
-    async def validate(self, headers: HeadersDict, data: BodyData) -> None:
-        """
-        Verify that the payload was sent from GitHub by validating SHA256.
-        """
-        self._validate_with_sig_header(headers["x-hub-signature-256"], data)
+    event_header = "x-github-event"
+    delivery_header = "x-github-delivery"
+    header_allowlist = frozenset(
+        {
+            "x-github-event",
+            "x-github-delivery",
+            "x-github-hook-id",
+            "x-github-hook-installation-target-id",
+            "x-github-hook-installation-target-type",
+        }
+    )
+    # Mostly the API URLs, the messages only need the web pages
+    pruning_profiles = {
+        "*": (
+            "repository.*_url",
+            "repository.owner.*_url",
+            "organization.*_url",
+            "sender.*_url",
+            "!**.html_url",
+            "!**.avatar_url",
+            "!**.clone_url",
+            "!**.ssh_url",
+        ),
+        "pull_request": (
+            "pull_request.**.*_url",
+            "pull_request._links",
+            "!pull_request.diff_url",
+            "!pull_request.patch_url",
+        ),
+        "issues": ("issue.**.*_url",),
+        "issue_comment": ("issue.**.*_url", "comment.**.*_url"),
+    }
 
     def _get_topic(self, headers: HeadersDict, body: Body) -> str:
         return f"github.{headers['x-github-event']}"
 
-    async def _get_agent(self, body: Body) -> str | None:
+    @classmethod
+    async def get_agent(cls, body: Body) -> str | None:
         return await get_fasjson().get_username_from_github(body["sender"]["login"])
@@ -17,6 +17,7 @@ from starlette.status import (
 from ..auth import current_user
 from ..database import get_session
 from ..models import Service, User
+from ..service_cache import get_service_cache
 from .models.service import (
     ServiceManyResult,
     ServiceRequest,
@@ -94,7 +95,8 @@ async def revoke_service(
     Revoke the service with the specified UUID
     """
     service.disabled = True
-    await session.flush()
+    await session.commit()
+    get_service_cache().invalidate(service.uuid)
     return ServiceResult.model_validate({"data": service}, context={"request": request})
 
 
@@ -115,6 +117,15 @@ async def update_service(
         if not data:
             continue
         setattr(service, attr, data)
+    for attr in ("max_body_size", "allowed_events", "denied_events", "pruning_profiles"):
+        if attr in body.data.model_fields_set:
+            setattr(service, attr, getattr(body.data, attr))
+    if "routing_rules" in body.data.model_fields_set:
+        service.routing_rules = (
+            None
+            if body.data.routing_rules is None
+            else [rule.model_dump(exclude_none=True) for rule in body.data.routing_rules]
+        )
 
     if body.data.username:
         query = select(User).filter_by(name=body.data.username)
@@ -129,7 +140,8 @@ async def update_service(
         if user not in service.users:
             service.users.append(user)
 
-    await session.flush()
+    await session.commit()
+    get_service_cache().invalidate(service.uuid)
 
     return ServiceResult.model_validate({"data": service}, context={"request": request})
 
@@ -149,5 +161,6 @@ async def regenerate_token(
     Regenerate the access token for the service with the requested UUID
     """
     service.token = uuid4().hex
-    await session.flush()
+    await session.commit()
+    get_service_cache().invalidate(service.uuid)
     return ServiceResult.model_validate({"data": service}, context={"request": request})
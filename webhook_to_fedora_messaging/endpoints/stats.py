@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends
+from starlette.status import HTTP_200_OK
+
+from ..fasjson import get_fasjson
+from .models.stats import CachesStatsResult, CacheTierStats
+from .util import admin_user, SerializedModel
+
+
+router = APIRouter(prefix="/stats")
+
+
+@router.get(
+    "/caches",
+    status_code=HTTP_200_OK,
+    response_model=CachesStatsResult,
+    tags=["stats"],
+    dependencies=[Depends(admin_user)],
+)
+async def caches_stats() -> SerializedModel:
+    """
+    Return the hit counts of the caches in the worker that handles the request
+    """
+    stats = get_fasjson().cache.stats
+    return {
+        "data": {
+            "fasjson": {tier: CacheTierStats.model_validate(count) for tier, count in stats.items()}
+        }
+    }
@@ -11,6 +11,7 @@ from ..auth import current_user
 from ..database import get_session
 from ..models.service import Service
 from ..models.user import User
+from ..service_cache import get_service_cache, ServiceSnapshot
 
 
 SerializedModel: TypeAlias = dict[Literal["data"], Any]
@@ -36,6 +37,21 @@ async def return_service_from_uuid(
     return service
 
 
+async def service_snapshot_from_uuid(uuid: str = Depends(is_uuid_vacant)) -> ServiceSnapshot:
+    service = await get_service_cache().get(uuid)
+    if service is None:
+        raise HTTPException(
+            HTTP_404_NOT_FOUND, f"Service with the requested UUID '{uuid}' was not found"
+        )
+    return service
+
+
+async def admin_user(user: User = Depends(current_user)) -> User:  # noqa : B008
+    if not user.is_admin:
+        raise HTTPException(HTTP_403_FORBIDDEN, "This operation is restricted to administrators")
+    return user
+
+
 async def authorized_service_from_uuid(
     service: Service = Depends(return_service_from_uuid),  # noqa : B008
     user: User = Depends(current_user),  # noqa : B008
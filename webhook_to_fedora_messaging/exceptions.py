@@ -13,3 +13,11 @@ class ConfigError(Exception):
 
 class SignatureMatchError(Exception):
     pass
+
+
+class PayloadDecodeError(Exception):
+    pass
+
+
+class PayloadTooLargeError(Exception):
+    pass
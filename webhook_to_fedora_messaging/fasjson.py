@@ -1,31 +1,93 @@
 import logging
+import random
+import time
+from collections.abc import AsyncIterator, Generator
 from functools import cache as ft_cache
 from functools import cached_property as ft_cached_property
+from functools import partial
+from pathlib import Path
 from typing import Any, cast
+from urllib.parse import urlencode
 
 import httpx
 from cashews import cache
+from cashews.exceptions import CircuitBreakerOpen
 from httpx_gssapi import HTTPSPNEGOAuth
 
-from .config import get_config
+from .cache import SingleFlight, TieredCache
+from .config import get_config, HTTPClientModel
+from .identities import get_fas_username
 
 
 log = logging.getLogger(__name__)
 
+# Searches that failed or that did not find a single user are retried sooner than the others.
+# After the first TTL, the cached result is still used while it is refreshed in the background,
+# until the second one (in seconds).
+SEARCH_TTL = (86400.0, 7 * 86400.0)
+NO_MATCH_TTL = (600.0, 3600.0)
+TIMEOUT_TTL = (60.0, 60.0)
+# Results are refreshed up to this share of the first TTL early, so that the results cached at
+# the same time are not all refreshed at once
+REFRESH_JITTER = 0.2
+
+
+class SessionSPNEGOAuth(HTTPSPNEGOAuth):
+    """SPNEGO authentication that reuses the server's session.
+
+    The server can answer with a session cookie, that the client sends back with the next
+    requests. Without it, negotiate upfront instead of waiting for a 401 response.
+    """
+
+    def auth_flow(self, request: httpx.Request) -> Generator[httpx.Request, httpx.Response, None]:
+        ctx = None if "Cookie" in request.headers else self.set_auth_header(request)
+        response = yield request
+        yield from self.handle_response(response, ctx)
+
 
 class FASJSONAsyncProxy:
     """Proxy for the FASJSON API endpoints used in this app"""
 
     API_VERSION = "v1"
 
-    def __init__(self, base_url: str) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        cache_size: int = 4096,
+        cache_path: Path | None = None,
+        cache_shared: bool = False,
+        client_config: HTTPClientModel | None = None,
+    ) -> None:
         self.base_url = base_url
-        self.client = httpx.AsyncClient(base_url=self.api_url, auth=HTTPSPNEGOAuth())
+        client_config = client_config or HTTPClientModel()
+        self.client = httpx.AsyncClient(
+            base_url=self.api_url,
+            auth=SessionSPNEGOAuth(),
+            timeout=httpx.Timeout(client_config.timeout, connect=client_config.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=client_config.max_connections,
+                max_keepalive_connections=client_config.max_keepalive_connections,
+                keepalive_expiry=client_config.keepalive_expiry,
+            ),
+            http2=client_config.http2,
+        )
+        self.cache = TieredCache(cache_size, cache_path, shared=cache_shared, prefix="fasjson:")
+        self._searches: SingleFlight[str, dict[str, Any]] = SingleFlight()
 
     @ft_cached_property
     def api_url(self) -> str:
         return f"{self.base_url.rstrip('/')}/{self.API_VERSION}"
 
+    # Stop querying FASJSON for a while when at least half of the requests fail, and then let a
+    # part of the requests through until it recovers.
+    @cache.circuit_breaker(
+        errors_rate=50,
+        period="1m",
+        min_calls=5,
+        ttl="30s",
+        half_open_ttl="30s",
+        exceptions=httpx.HTTPError,
+    )
     async def get(self, url: str, **kwargs: Any) -> Any:
         """Query the API for a single result."""
         kwargs["follow_redirects"] = True
@@ -33,19 +95,83 @@ class FASJSONAsyncProxy:
         response.raise_for_status()
         return response.json()
 
-    @cache(ttl="1d", prefix="v1")
     async def search_users(
         self,
         **params: Any,
     ) -> list[dict[str, Any]]:
-        return [user for user in (await self.get("/search/users/", params=params))["result"]]
+        key = f"{self.API_VERSION}:search_users:{urlencode(sorted(params.items()))}"
+        entry = await self.cache.get(key)
+        if entry is None:
+            # Concurrent cache misses for the same search share a single request
+            entry = await self._searches.do(key, partial(self._search_users, key, params))
+        elif entry.get("fresh_until", 0) < time.time():
+            self._searches.start(key, partial(self._refresh_search, key, params, entry))
+        if "timeout" in entry:
+            raise httpx.TimeoutException(entry["timeout"])
+        return cast(list[dict[str, Any]], entry["result"])
+
+    async def _search_users(self, key: str, params: dict[str, Any]) -> dict[str, Any]:
+        try:
+            response = await self.get("/search/users/", params=params)
+        except httpx.TimeoutException as e:
+            return await self._store_search(key, {"timeout": str(e)}, TIMEOUT_TTL)
+        return await self._store_search(key, {"result": response["result"]})
+
+    async def _refresh_search(
+        self, key: str, params: dict[str, Any], stale: dict[str, Any]
+    ) -> dict[str, Any]:
+        try:
+            response = await self.get("/search/users/", params=params)
+        except Exception as e:
+            log.warning("Could not refresh the FASJSON search for %r: %s", params, e)
+            return stale
+        return await self._store_search(key, {"result": response["result"]})
+
+    async def _store_search(
+        self, key: str, entry: dict[str, Any], ttls: tuple[float, float] | None = None
+    ) -> dict[str, Any]:
+        if ttls is None:
+            ttls = SEARCH_TTL if len(entry["result"]) == 1 else NO_MATCH_TTL
+        soft_ttl, hard_ttl = ttls
+        soft_ttl *= 1 - random.uniform(0, REFRESH_JITTER)  # noqa: S311
+        entry["fresh_until"] = time.time() + soft_ttl
+        await self.cache.set(key, entry, hard_ttl)
+        return entry
+
+    async def iter_users(
+        self, fields: list[str], page_size: int = 40
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """Go through all the users, page by page, with only the requested fields."""
+        headers = {"X-Fields": "{" + ",".join(fields) + "}"}
+        page_number = 1
+        while True:
+            response = await self.get(
+                "/users/",
+                params={"page_size": page_size, "page_number": page_number},
+                headers=headers,
+            )
+            yield response["result"]
+            if page_number >= response["page"]["total_pages"]:
+                break
+            page_number += 1
 
     async def get_username_from_github(self, username: str) -> str | None:
+        local_username = await get_fas_username("github", username)
+        if local_username is not None:
+            return local_username
         try:
             users = await self.search_users(github_username=username)
         except httpx.TimeoutException:
             log.exception("Timeout fetching the FAS user with Github username %r", username)
             return None
+        except CircuitBreakerOpen:
+            log.warning(
+                "Not fetching the FAS user with Github username %r: FASJSON is failing", username
+            )
+            return None
+        except httpx.HTTPError:
+            log.exception("Could not fetch the FAS user with Github username %r", username)
+            return None
         if len(users) == 1:
             return cast(str, users[0]["username"])
         return None
@@ -54,8 +180,21 @@ class FASJSONAsyncProxy:
         # TODO: Revisit user retrieval using FASJSON once the FAS supports Forgejo Auth
         return None
 
+    async def close(self) -> None:
+        await self.client.aclose()
+        await self.cache.close()
+
 
 @ft_cache
 def get_fasjson() -> FASJSONAsyncProxy:
     config = get_config()
-    return FASJSONAsyncProxy(config.fasjson_url)
+    cache_shared = config.fasjson.cache_shared
+    if cache_shared is None:
+        cache_shared = not config.cache.url.startswith("mem://")
+    return FASJSONAsyncProxy(
+        config.fasjson_url,
+        cache_size=config.fasjson.cache_size,
+        cache_path=config.fasjson.cache_path,
+        cache_shared=cache_shared,
+        client_config=config.fasjson.client,
+    )
@@ -0,0 +1,167 @@
+"""
+Local index of the FAS usernames of the forges accounts.
+
+Looking up the sender of a webhook in this index avoids a request to FASJSON. The GitHub
+identities are synchronized with FASJSON in bulk, with the ``w2fm sync-identities`` command. The
+other forges' identities are imported from a file with ``w2fm import-identities``, or managed by
+the administrators through the API.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+from functools import cache
+from typing import TYPE_CHECKING
+
+from sqlalchemy import delete, func, select
+
+from .cache import SingleFlight
+from .config import get_config
+from .database import with_db_session
+from .models import ForgeIdentity
+
+
+if TYPE_CHECKING:
+    from .fasjson import FASJSONAsyncProxy
+
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IdentitiesSyncResult:
+    added: int
+    updated: int
+    removed: int
+    # Forge usernames claimed by several FAS users, they are not stored
+    conflicts: int = 0
+
+
+class IdentityIndex:
+    """In-memory copy of the stored identities of a forge.
+
+    Lookups don't query the database. Whether the stored identities have changed is checked in
+    the background, at most every ``reload_interval`` seconds, and the copy is rebuilt if they
+    have.
+    """
+
+    def __init__(self, forge: str, reload_interval: float) -> None:
+        self.forge = forge
+        self.reload_interval = reload_interval
+        self._usernames: dict[str, str] | None = None
+        self._version: tuple[int, datetime | None] | None = None
+        self._checked_at = 0.0
+        self._refreshing: SingleFlight[str, None] = SingleFlight()
+        self._background_refresh: asyncio.Task[None] | None = None
+
+    async def get_username(self, username: str) -> str | None:
+        if self._usernames is None:
+            await self.refresh()
+        elif time.monotonic() - self._checked_at > self.reload_interval and (
+            self._background_refresh is None or self._background_refresh.done()
+        ):
+            self._background_refresh = asyncio.create_task(self.refresh())
+            self._background_refresh.add_done_callback(self._refresh_done)
+        return (self._usernames or {}).get(username.lower())
+
+    def _refresh_done(self, task: asyncio.Task[None]) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            log.error(
+                "Could not refresh the %s identities in the background",
+                self.forge,
+                exc_info=task.exception(),
+            )
+
+    async def refresh(self) -> None:
+        """Rebuild the copy if the stored identities have changed."""
+        await self._refreshing.do(self.forge, self._refresh)
+
+    async def _refresh(self) -> None:
+        self._checked_at = time.monotonic()
+        version_query = select(func.count(), func.max(ForgeIdentity.updated_at)).filter_by(
+            forge=self.forge
+        )
+        query = select(ForgeIdentity.forge_username, ForgeIdentity.fas_username).filter_by(
+            forge=self.forge
+        )
+        async with with_db_session() as session:
+            count, last_update = (await session.execute(version_query)).one()
+            if self._usernames is not None and self._version == (count, last_update):
+                return
+            rows = await session.execute(query)
+            usernames = {forge_username: fas_username for forge_username, fas_username in rows}
+        log.debug("Loaded %s %s identities", len(usernames), self.forge)
+        self._usernames = usernames
+        self._version = (count, last_update)
+
+
+@cache
+def get_identity_index(forge: str) -> IdentityIndex:
+    return IdentityIndex(forge, reload_interval=get_config().identities.reload_interval)
+
+
+async def get_fas_username(forge: str, username: str) -> str | None:
+    return await get_identity_index(forge).get_username(username)
+
+
+async def sync_identities(forge: str, identities: dict[str, str]) -> IdentitiesSyncResult:
+    """
+    Make the stored identities of a forge match the ones provided, by forge username.
+
+    The usernames on the forge must be in lower case.
+    """
+    added = updated = 0
+    async with with_db_session() as session:
+        existing = {
+            identity.forge_username: identity
+            for identity in await session.scalars(select(ForgeIdentity).filter_by(forge=forge))
+        }
+        for forge_username, fas_username in identities.items():
+            identity = existing.pop(forge_username, None)
+            if identity is None:
+                session.add(
+                    ForgeIdentity(
+                        forge=forge, forge_username=forge_username, fas_username=fas_username
+                    )
+                )
+                added += 1
+            elif identity.fas_username != fas_username:
+                identity.fas_username = fas_username
+                updated += 1
+        if existing:
+            await session.execute(
+                delete(ForgeIdentity).where(
+                    ForgeIdentity.id.in_([identity.id for identity in existing.values()])
+                )
+            )
+    return IdentitiesSyncResult(added=added, updated=updated, removed=len(existing))
+
+
+async def sync_github_identities(
+    fasjson: "FASJSONAsyncProxy", page_size: int = 40
+) -> IdentitiesSyncResult:
+    """
+    Store the GitHub usernames of all the FAS users.
+
+    The users are fetched page by page, and the table is only changed once all of them are known.
+    """
+    identities: dict[str, str] = {}
+    conflicting: set[str] = set()
+    pages = 0
+    async for users in fasjson.iter_users(["username", "github_username"], page_size=page_size):
+        pages += 1
+        for user in users:
+            github_username = user.get("github_username")
+            if not github_username:
+                continue
+            github_username = github_username.lower()
+            if github_username in identities:
+                conflicting.add(github_username)
+            identities[github_username] = user["username"]
+    for github_username in conflicting:
+        del identities[github_username]
+    log.info("Fetched %s pages of users from FASJSON", pages)
+    result = await sync_identities("github", identities)
+    return replace(result, conflicts=len(conflicting))
@@ -21,9 +21,12 @@ from starlette.requests import Request
 
 from .cache import configure_cache
 from .config import get_config
+from .counters import get_service_counters
 from .database import get_db_manager
-from .endpoints import message, service, user
+from .endpoints import identity, message, service, stats, user
 from .fasjson import get_fasjson
+from .middleware import SkipPathsMiddleware
+from .outbox import get_outbox_publisher
 
 
 logger = logging.getLogger(__name__)
@@ -34,6 +37,8 @@ tags_metadata = [
     {"name": "messages", "description": "Operations on messages"},
     {"name": "services", "description": "Operations on services"},
     {"name": "users", "description": "Operations on users"},
+    {"name": "identities", "description": "Operations on the FAS usernames of forge accounts"},
+    {"name": "stats", "description": "Statistics of the running service"},
 ]
 
 PREFIX = "/api/v1"
@@ -45,7 +50,19 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[Any, Any]:
     get_db_manager()
     configure_cache()
     get_fasjson()
+    message.get_message_responses()
+    config = get_config()
+    await get_service_counters().start()
+    if config.outbox.enabled:
+        await get_outbox_publisher().start()
     yield
+    if config.outbox.enabled:
+        await get_outbox_publisher().stop()
+    # Write the last counts
+    await get_service_counters().stop()
+    # Close the HTTP connections, a new client is needed after that
+    await get_fasjson().close()
+    get_fasjson.cache_clear()
 
 
 def create_app() -> FastAPI:
@@ -67,13 +84,23 @@ def create_app() -> FastAPI:
         lifespan=lifespan,
     )
 
+    # The webhooks are not sent by browsers, they don't need sessions or CORS
+    webhook_paths = [f"{PREFIX}{message.router.prefix}"]
+
     # We need this for auth to save temporary code & state in session.
     # We don't need an actual secret key, a random one is fine, since the auth data is only there
     # during the auth process.
-    app.add_middleware(SessionMiddleware, secret_key=config.session_secret)
+    app.add_middleware(
+        SkipPathsMiddleware,
+        middleware=SessionMiddleware,
+        skip_paths=webhook_paths,
+        secret_key=config.session_secret,
+    )
 
     app.add_middleware(
-        CORSMiddleware,
+        SkipPathsMiddleware,
+        middleware=CORSMiddleware,
+        skip_paths=webhook_paths,
         allow_origins=["*"],
         allow_credentials=True,
         allow_methods=["*"],
@@ -84,6 +111,8 @@ def create_app() -> FastAPI:
     app.include_router(user.router, prefix=PREFIX)
     app.include_router(service.router, prefix=PREFIX)
     app.include_router(message.router, prefix=PREFIX)
+    app.include_router(identity.router, prefix=PREFIX)
+    app.include_router(stats.router, prefix=PREFIX)
 
     async def _redirect_to_docs(request: Request) -> RedirectResponse:
         return RedirectResponse(app.docs_url or "/docs")
@@ -0,0 +1,37 @@
+"""
+Middleware that only apply to some of the routes.
+
+The sessions and CORS are only needed by the browser-facing routes (the OIDC login and the API
+documentation), the forges sending webhooks don't need them.
+"""
+
+from collections.abc import Sequence
+from typing import Any
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class SkipPathsMiddleware:
+    """Apply a middleware to all the requests, except those under some paths."""
+
+    def __init__(
+        self, app: ASGIApp, /, middleware: type[Any], skip_paths: Sequence[str], **options: Any
+    ) -> None:
+        self.app = app
+        self.wrapped: ASGIApp = middleware(app, **options)
+        self.skip_paths = tuple(path.rstrip("/") + "/" for path in skip_paths)
+
+    def _skipped(self, scope: Scope) -> bool:
+        if scope["type"] not in ("http", "websocket"):
+            return False
+        path: str = scope["path"]
+        root_path: str = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path) :]
+        return path.startswith(self.skip_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self._skipped(scope):
+            await self.app(scope, receive, send)
+        else:
+            await self.wrapped(scope, receive, send)
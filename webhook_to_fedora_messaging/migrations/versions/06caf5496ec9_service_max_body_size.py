@@ -0,0 +1,28 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Service.max_body_size
+
+Revision ID: 06caf5496ec9
+Revises: d11e1a0664f4
+Create Date: 2026-10-18 09:49:50.018386
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "06caf5496ec9"
+down_revision = "d11e1a0664f4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("services", sa.Column("max_body_size", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("services", "max_body_size")
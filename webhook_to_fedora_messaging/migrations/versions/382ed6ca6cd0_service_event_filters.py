@@ -0,0 +1,30 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Service event filters
+
+Revision ID: 382ed6ca6cd0
+Revises: 3ca602deb5ea
+Create Date: 2026-10-18 10:13:09.973971
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "382ed6ca6cd0"
+down_revision = "3ca602deb5ea"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("services", sa.Column("allowed_events", sa.JSON(), nullable=True))
+    op.add_column("services", sa.Column("denied_events", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("services", "denied_events")
+    op.drop_column("services", "allowed_events")
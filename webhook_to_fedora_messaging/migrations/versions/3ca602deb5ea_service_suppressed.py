@@ -0,0 +1,30 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Service.suppressed
+
+Revision ID: 3ca602deb5ea
+Revises: 6be4b709a472
+Create Date: 2026-10-18 10:11:22.380495
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "3ca602deb5ea"
+down_revision = "6be4b709a472"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "services", sa.Column("suppressed", sa.Integer(), nullable=False, server_default="0")
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("services", "suppressed")
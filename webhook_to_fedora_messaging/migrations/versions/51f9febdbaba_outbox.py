@@ -0,0 +1,51 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Outbox
+
+Revision ID: 51f9febdbaba
+Revises: 4f1f49d72fa8
+Create Date: 2026-10-18 09:36:46.582196
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "51f9febdbaba"
+down_revision = "4f1f49d72fa8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("message_id", sa.String(), nullable=False),
+        sa.Column("service_id", sa.Integer(), nullable=False),
+        sa.Column("serialized", sa.Text(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("sent_date", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("creation_date", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["service_id"],
+            ["services.id"],
+            name=op.f("fk_outbox_service_id_services"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_outbox")),
+        sa.UniqueConstraint("message_id", name=op.f("uq_outbox_message_id")),
+    )
+    op.create_index(op.f("ix_outbox_next_attempt"), "outbox", ["next_attempt"], unique=False)
+    op.create_index(op.f("ix_outbox_sent_date"), "outbox", ["sent_date"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_outbox_sent_date"), table_name="outbox")
+    op.drop_index(op.f("ix_outbox_next_attempt"), table_name="outbox")
+    op.drop_table("outbox")
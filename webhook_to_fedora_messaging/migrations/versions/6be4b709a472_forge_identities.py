@@ -0,0 +1,37 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Forge identities
+
+Revision ID: 6be4b709a472
+Revises: 06caf5496ec9
+Create Date: 2026-10-18 09:57:23.136422
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "6be4b709a472"
+down_revision = "06caf5496ec9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "forge_identities",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("forge", sa.String(), nullable=False),
+        sa.Column("forge_username", sa.String(), nullable=False),
+        sa.Column("fas_username", sa.String(), nullable=False),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_forge_identities")),
+        sa.UniqueConstraint("forge", "forge_username", name=op.f("uq_forge_identities_forge")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("forge_identities")
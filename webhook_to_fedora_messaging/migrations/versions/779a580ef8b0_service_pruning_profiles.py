@@ -0,0 +1,28 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Service pruning profiles
+
+Revision ID: 779a580ef8b0
+Revises: eab37e948a9b
+Create Date: 2026-10-18 10:20:28.005237
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "779a580ef8b0"
+down_revision = "eab37e948a9b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("services", sa.Column("pruning_profiles", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("services", "pruning_profiles")
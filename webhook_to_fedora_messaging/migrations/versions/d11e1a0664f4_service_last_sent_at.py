@@ -0,0 +1,28 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Service.last_sent_at
+
+Revision ID: d11e1a0664f4
+Revises: 51f9febdbaba
+Create Date: 2026-10-18 09:45:01.056760
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "d11e1a0664f4"
+down_revision = "51f9febdbaba"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("services", sa.Column("last_sent_at", sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("services", "last_sent_at")
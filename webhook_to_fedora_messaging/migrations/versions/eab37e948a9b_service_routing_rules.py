@@ -0,0 +1,32 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+"""Service routing rules
+
+Revision ID: eab37e948a9b
+Revises: 382ed6ca6cd0
+Create Date: 2026-10-18 10:14:35.940981
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "eab37e948a9b"
+down_revision = "382ed6ca6cd0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "services", sa.Column("dropped", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.add_column("services", sa.Column("routing_rules", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("services", "routing_rules")
+    op.drop_column("services", "dropped")
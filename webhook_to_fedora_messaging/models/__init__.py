@@ -2,8 +2,10 @@
 #
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+from .forge_identity import ForgeIdentity
+from .outbox import OutboxMessage
 from .service import Service
 from .user import User
 
 
-__all__ = ("Service", "User")
+__all__ = ("ForgeIdentity", "OutboxMessage", "Service", "User")
@@ -0,0 +1,33 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from datetime import datetime, UTC
+from functools import partial
+
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import TIMESTAMP
+
+from ..database import Base
+
+
+class ForgeIdentity(Base):
+    """
+    The FAS username of an account on a forge
+    """
+
+    __tablename__ = "forge_identities"
+    # Also the index used to look up the senders of the webhooks
+    __table_args__ = (UniqueConstraint("forge", "forge_username"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    forge: Mapped[str]
+    # Lower case, forges usernames are case insensitive
+    forge_username: Mapped[str]
+    fas_username: Mapped[str]
+    updated_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        default=partial(datetime.now, tz=UTC),
+        onupdate=partial(datetime.now, tz=UTC),
+    )
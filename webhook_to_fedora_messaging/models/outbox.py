@@ -0,0 +1,34 @@
+# SPDX-FileCopyrightText: Contributors to the Fedora Project
+#
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from datetime import datetime, UTC
+from functools import partial
+from typing import Optional
+
+from sqlalchemy import ForeignKey, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import TIMESTAMP
+
+from ..database import Base
+from .util import CreatableMixin
+
+
+class OutboxMessage(Base, CreatableMixin):
+    """
+    A message that was accepted but may not have been published to the broker yet
+    """
+
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    message_id: Mapped[str] = mapped_column(unique=True)
+    service_id: Mapped[int] = mapped_column(ForeignKey("services.id", ondelete="CASCADE"))
+    # As produced by fedora_messaging.message.dumps()
+    serialized: Mapped[str] = mapped_column(Text)
+    attempts: Mapped[int] = mapped_column(default=0)
+    next_attempt: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), default=partial(datetime.now, tz=UTC), index=True
+    )
+    last_error: Mapped[Optional[str]]
+    sent_date: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), index=True)
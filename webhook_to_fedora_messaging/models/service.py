@@ -2,11 +2,13 @@
 #
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from typing import Optional, TYPE_CHECKING
+from datetime import datetime
+from typing import Any, Optional, TYPE_CHECKING
 from uuid import uuid4
 
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import JSON, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.types import TIMESTAMP
 
 from ..database import Base
 from .owners import owners_table
@@ -28,4 +30,18 @@ class Service(Base, UUIDCreatableMixin, CreatableMixin):
     desc: Mapped[Optional[str]]
     disabled: Mapped[bool] = mapped_column(default=False)
     sent: Mapped[int] = mapped_column(default=0)
+    # Messages not sent because another service of the same forge had just sent them
+    suppressed: Mapped[int] = mapped_column(default=0)
+    # Messages not sent because they did not match the routing rules
+    dropped: Mapped[int] = mapped_column(default=0)
+    # Overrides the global limit of the payload size, in bytes
+    max_body_size: Mapped[Optional[int]]
+    # Event types to send (all of them when unset) and to ignore
+    allowed_events: Mapped[Optional[list[str]]] = mapped_column(JSON)
+    denied_events: Mapped[Optional[list[str]]] = mapped_column(JSON)
+    # Only the messages that match one of these rules are sent (see the routing module)
+    routing_rules: Mapped[Optional[list[dict[str, Any]]]] = mapped_column(JSON)
+    # Replaces the parser's pruning profiles (see the pruning module), empty to keep the full body
+    pruning_profiles: Mapped[Optional[dict[str, list[str]]]] = mapped_column(JSON)
+    last_sent_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
     users: Mapped[list["User"]] = relationship(secondary=owners_table, back_populates="services")
@@ -0,0 +1,176 @@
+"""
+Transactional outbox.
+
+Accepted messages are stored in the database by the webhook handler, and a background task
+publishes them to the broker. This keeps the broker latency (and its outages) out of the
+webhook request.
+"""
+
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import datetime, timedelta, UTC
+from functools import cache
+
+from fedora_messaging import message as fm_message
+from fedora_messaging.api import Message
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import get_config
+from .database import with_db_session
+from .endpoints.parser import get_agent
+from .models import OutboxMessage
+from .publishing import publish
+
+
+log = logging.getLogger(__name__)
+
+
+async def enqueue(session: AsyncSession, message: Message, service_id: int) -> None:
+    """Store the message in the outbox. It will be published when the session is committed."""
+    session.add(
+        OutboxMessage(
+            message_id=message.id,
+            service_id=service_id,
+            serialized=fm_message.dumps(message),
+        )
+    )
+    await session.flush()
+
+
+class OutboxPublisher:
+    """Drain the outbox in batches and publish its messages to the broker."""
+
+    def __init__(
+        self,
+        batch_size: int,
+        poll_interval: float,
+        max_backoff: float,
+        max_attempts: int,
+        retention: float,
+        attach_agent: bool = False,
+    ) -> None:
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.attach_agent = attach_agent
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def wake_up(self) -> None:
+        """Don't wait for the next poll to drain the outbox."""
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="outbox-publisher")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                count = await self.drain()
+            except Exception:
+                log.exception("Could not drain the outbox")
+                count = 0
+            if count >= self.batch_size:
+                # There are probably more messages waiting
+                continue
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+
+    async def drain(self) -> int:
+        """Publish one batch of pending messages. Return the number of messages processed."""
+        now = datetime.now(tz=UTC)
+        async with with_db_session() as session:
+            query = (
+                select(OutboxMessage)
+                .where(
+                    OutboxMessage.sent_date.is_(None),
+                    OutboxMessage.next_attempt <= now,
+                    OutboxMessage.attempts < self.max_attempts,
+                )
+                .order_by(OutboxMessage.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = (await session.scalars(query)).all()
+            results = await asyncio.gather(
+                *[self._publish(row) for row in rows], return_exceptions=True
+            )
+            for row, result in zip(rows, results, strict=True):
+                if isinstance(result, BaseException):
+                    self._schedule_retry(row, result)
+                else:
+                    row.sent_date = datetime.now(tz=UTC)
+            await session.execute(
+                delete(OutboxMessage).where(
+                    OutboxMessage.sent_date < now - timedelta(seconds=self.retention)
+                )
+            )
+        return len(rows)
+
+    async def _publish(self, row: OutboxMessage) -> None:
+        message = fm_message.loads(row.serialized)[0]
+        if self.attach_agent and message.body.get("agent") is None:
+            await self._attach_agent(message)
+        await publish(message)
+
+    async def _attach_agent(self, message: Message) -> None:
+        """
+        The agent may have been left out when the message was built, if looking it up took too long.
+        """
+        try:
+            agent = await get_agent(message)
+        except Exception:
+            log.exception("Could not look up the agent of message %s", message.id)
+            return
+        if agent is not None:
+            message.body = {**message.body, "agent": agent}
+
+    def _schedule_retry(self, row: OutboxMessage, error: BaseException) -> None:
+        row.attempts += 1
+        row.last_error = str(error)
+        delay = min(self.max_backoff, 2**row.attempts)
+        row.next_attempt = datetime.now(tz=UTC) + timedelta(seconds=delay)
+        if row.attempts >= self.max_attempts:
+            log.error(
+                "Giving up on publishing message %s after %s attempts: %s",
+                row.message_id,
+                row.attempts,
+                error,
+            )
+        else:
+            log.warning(
+                "Could not publish message %s (attempt %s), retrying in %s seconds: %s",
+                row.message_id,
+                row.attempts,
+                delay,
+                error,
+            )
+
+
+@cache
+def get_outbox_publisher() -> OutboxPublisher:
+    config = get_config()
+    return OutboxPublisher(
+        batch_size=config.outbox.batch_size,
+        poll_interval=config.outbox.poll_interval,
+        max_backoff=config.outbox.max_backoff,
+        max_attempts=config.outbox.max_attempts,
+        retention=config.outbox.retention,
+        attach_agent=config.fasjson.attach_agent_on_publish,
+    )
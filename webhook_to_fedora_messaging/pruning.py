@@ -0,0 +1,127 @@
+"""
+Pruning of the payloads before they are published.
+
+The forges repeat large objects in their payloads, with many API URLs that the consumers don't
+read. A pruning profile lists the key paths to remove from the payloads of an event type. The
+segments of a path are glob patterns on the keys, lists are traversed transparently, ``**``
+matches any number of segments and paths starting with ``!`` keep the keys that other paths
+would remove, for example::
+
+    {
+        "*": ["repository.*_url", "sender.*_url", "!**.html_url"],
+        "pull_request": ["pull_request.**.*_url"],
+    }
+
+The ``*`` profile applies to all the event types, in addition to their own profile. The parsers
+declare default profiles, that services can replace. No profiles at all keep the full payloads.
+"""
+
+import fnmatch
+import hashlib
+import json
+import re
+from collections.abc import Iterable, Mapping
+from typing import Any, TypeAlias
+
+
+# A compiled path, where None stands for "**"
+Path: TypeAlias = tuple[re.Pattern[str] | None, ...]
+
+ALL_EVENTS = "*"
+
+
+def compile_path(path: str) -> Path:
+    segments = path.split(".")
+    if not all(segments) or segments[-1] == "**":
+        raise ValueError(f"Invalid key path: {path!r}")
+    return tuple(
+        None if segment == "**" else re.compile(fnmatch.translate(segment)) for segment in segments
+    )
+
+
+def _step(paths: Iterable[Path], key: str) -> tuple[bool, list[Path]]:
+    """
+    Match a key against the first segment of the paths.
+
+    Return whether one of the paths ends on this key, and the rest of the paths to match against
+    its value.
+    """
+    ends_here = False
+    children: list[Path] = []
+    pending = list(paths)
+    while pending:
+        path = pending.pop()
+        head, rest = path[0], path[1:]
+        if head is None:
+            # Match deeper, or match nothing
+            children.append(path)
+            pending.append(rest)
+        elif head.match(key):
+            if rest:
+                children.append(rest)
+            else:
+                ends_here = True
+    return ends_here, children
+
+
+def _prune(node: Any, removed: list[Path], kept: list[Path]) -> bool:
+    changed = False
+    if isinstance(node, list):
+        for item in node:
+            changed |= _prune(item, removed, kept)
+        return changed
+    if not isinstance(node, dict):
+        return changed
+    for key in list(node):
+        remove, removed_children = _step(removed, key)
+        keep, kept_children = _step(kept, key)
+        if remove and not keep:
+            del node[key]
+            changed = True
+        elif removed_children:
+            changed |= _prune(node[key], removed_children, kept_children)
+    return changed
+
+
+class PruningProfile:
+    """The key paths to remove from the payloads of an event type."""
+
+    def __init__(self, paths: Iterable[str]) -> None:
+        self._removed: list[Path] = []
+        self._kept: list[Path] = []
+        for path in paths:
+            if path.startswith("!"):
+                self._kept.append(compile_path(path[1:]))
+            else:
+                self._removed.append(compile_path(path))
+
+    def prune(self, body: dict[str, Any]) -> bool:
+        """Remove the key paths from the body, in place. Return whether keys were removed."""
+        return _prune(body, self._removed, self._kept)
+
+
+class PruningProfiles:
+    """Profiles compiled once, for all the messages of a parser or of a service."""
+
+    def __init__(self, profiles: Mapping[str, Iterable[str]]) -> None:
+        profiles = {event: list(paths) for event, paths in profiles.items()}
+        # The same for identical profiles, in all the workers
+        self.fingerprint = hashlib.sha256(
+            json.dumps(profiles, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        common = profiles.get(ALL_EVENTS, [])
+        self._default = PruningProfile(common)
+        self._profiles = {
+            event: PruningProfile([*common, *paths])
+            for event, paths in profiles.items()
+            if event != ALL_EVENTS
+        }
+
+    def get(self, event: str | None) -> PruningProfile:
+        if event is None:
+            return self._default
+        return self._profiles.get(event, self._default)
+
+
+# Keep the full payloads
+NO_PRUNING = PruningProfiles({})
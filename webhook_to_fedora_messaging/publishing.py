@@ -1,16 +1,23 @@
+import asyncio
 import logging
 import sys
 import traceback
+from typing import cast
 
 import backoff
+import crochet
 from backoff.types import Details
-from fastapi.concurrency import run_in_threadpool
 from fedora_messaging import api
 from fedora_messaging import exceptions as fm_exceptions
+from twisted.internet import defer, interfaces, reactor
+from twisted.python.failure import Failure
 
 
 log = logging.getLogger(__name__)
 
+# Same default as fedora_messaging.api.publish()
+PUBLISH_TIMEOUT = 30
+
 
 def backoff_hdlr(details: Details) -> None:
     log.warning("Publishing message failed. Retrying. %s", traceback.format_tb(sys.exc_info()[2]))
@@ -20,6 +27,59 @@ def giveup_hdlr(details: Details) -> None:
     log.error("Publishing message failed. Giving up. %s", traceback.format_tb(sys.exc_info()[2]))
 
 
+def _set_result(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _set_exception(future: asyncio.Future[None], failure: Failure) -> None:
+    if not future.done():
+        future.set_exception(cast(BaseException, failure.value))
+
+
+async def _publish_from_loop(message: api.Message, timeout: float) -> None:
+    """
+    Publish the message with the Twisted service without blocking a thread.
+
+    The Twisted service keeps a single connection and publishing channel for the whole process,
+    with publisher confirms enabled. Publishing is scheduled in the reactor thread and the
+    broker's confirmation is awaited on the asyncio loop, so many messages can be waiting for
+    their confirmation at the same time.
+    """
+    crochet.setup()
+    loop = asyncio.get_running_loop()
+    future: asyncio.Future[None] = loop.create_future()
+    deferreds: list[defer.Deferred[None]] = []
+    threaded_reactor = cast(interfaces.IReactorFromThreads, reactor)
+
+    def _start() -> None:
+        # This runs in the reactor thread.
+        # Same initialization as fedora_messaging.api.publish()
+        api._init_twisted_service()
+        deferred = defer.maybeDeferred(api.twisted_publish, message)
+        deferreds.append(deferred)
+        deferred.addCallbacks(
+            lambda result: loop.call_soon_threadsafe(_set_result, future),
+            lambda failure: loop.call_soon_threadsafe(_set_exception, future, failure),
+        )
+
+    def _cancel() -> None:
+        for deferred in deferreds:
+            deferred.cancel()
+
+    threaded_reactor.callFromThread(_start)
+    try:
+        await asyncio.wait_for(future, timeout)
+    except TimeoutError as e:
+        threaded_reactor.callFromThread(_cancel)
+        raise fm_exceptions.PublishTimeout(
+            f"Publishing timed out after waiting {timeout} seconds."
+        ) from e
+    except asyncio.CancelledError:
+        threaded_reactor.callFromThread(_cancel)
+        raise
+
+
 @backoff.on_exception(
     backoff.expo,
     (fm_exceptions.ConnectionException, fm_exceptions.PublishException),
@@ -28,4 +88,4 @@ def giveup_hdlr(details: Details) -> None:
     on_giveup=giveup_hdlr,
 )
 async def publish(message: api.Message) -> None:
-    await run_in_threadpool(api.publish, message)
+    await _publish_from_loop(message, PUBLISH_TIMEOUT)
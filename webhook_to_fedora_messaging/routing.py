@@ -0,0 +1,57 @@
+"""
+Routing rules of the services.
+
+A service can restrict the messages it sends with a list of rules. A message is sent when it
+matches one of the rules, and it matches a rule when all the attributes of the rule match. The
+attributes are glob patterns, or lists of glob patterns, for example::
+
+    [
+        {"repository": "fedora-infra/*", "ref": ["refs/heads/main", "refs/tags/*"]},
+        {"repository": "fedora-infra/webhook-to-fedora-messaging", "action": "opened"},
+    ]
+"""
+
+import fnmatch
+import re
+from collections.abc import Mapping
+from typing import Any
+
+
+# The attributes of the payloads that rules can match
+ROUTE_ATTRIBUTES = ("repository", "ref", "action")
+
+
+def get_route_attributes(body: Mapping[str, Any]) -> dict[str, str | None]:
+    repository = body.get("repository")
+    return {
+        "repository": repository.get("full_name") if isinstance(repository, dict) else None,
+        "ref": body.get("ref"),
+        "action": body.get("action"),
+    }
+
+
+class RoutingRules:
+    """Rules compiled to regular expressions, once for all the messages of a service."""
+
+    def __init__(self, rules: list[dict[str, str | list[str]]]) -> None:
+        self._rules = [self._compile(rule) for rule in rules]
+
+    @staticmethod
+    def _compile(rule: dict[str, str | list[str]]) -> list[tuple[str, re.Pattern[str]]]:
+        compiled = []
+        for attribute, patterns in rule.items():
+            if isinstance(patterns, str):
+                patterns = [patterns]
+            regex = "|".join(fnmatch.translate(pattern) for pattern in patterns)
+            compiled.append((attribute, re.compile(regex, re.IGNORECASE)))
+        return compiled
+
+    def match(self, body: Mapping[str, Any]) -> bool:
+        attributes = get_route_attributes(body)
+        for rule in self._rules:
+            if all(
+                (value := attributes.get(attribute)) is not None and pattern.match(value)
+                for attribute, pattern in rule
+            ):
+                return True
+        return False
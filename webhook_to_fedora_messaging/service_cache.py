@@ -0,0 +1,101 @@
+"""
+In-process cache of the services that receive webhooks.
+
+The message endpoint only needs a few attributes of the service, so it uses read-only
+snapshots that are not attached to a database session, and that can be shared between requests.
+"""
+
+import logging
+from dataclasses import dataclass, fields
+from functools import cache, partial
+
+from sqlalchemy import bindparam, select
+
+from .cache import LRUCache, SingleFlight
+from .config import get_config
+from .database import with_readonly_connection
+from .models import Service
+from .pruning import PruningProfiles
+from .routing import RoutingRules
+
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ServiceSnapshot:
+    id: int
+    uuid: str
+    name: str
+    type: str
+    token: str
+    disabled: bool
+    max_body_size: int | None
+    allowed_events: frozenset[str] | None
+    denied_events: frozenset[str] | None
+    routing_rules: RoutingRules | None
+    pruning_profiles: PruningProfiles | None
+
+    def accepts_event(self, event: str) -> bool:
+        if self.allowed_events is not None and event not in self.allowed_events:
+            return False
+        return self.denied_events is None or event not in self.denied_events
+
+
+# Only the columns of the snapshot, with Core rather than the ORM
+SNAPSHOT_QUERY = select(
+    *[Service.__table__.c[field.name] for field in fields(ServiceSnapshot)]
+).where(Service.__table__.c.uuid == bindparam("uuid"))
+
+
+async def load_service_snapshot(uuid: str) -> ServiceSnapshot | None:
+    async with with_readonly_connection() as connection:
+        row = (await connection.execute(SNAPSHOT_QUERY, {"uuid": uuid})).one_or_none()
+    if row is None:
+        return None
+    values = row._asdict()
+    for name in ("allowed_events", "denied_events"):
+        if values[name] is not None:
+            values[name] = frozenset(values[name])
+    if values["routing_rules"] is not None:
+        values["routing_rules"] = RoutingRules(values["routing_rules"])
+    if values["pruning_profiles"] is not None:
+        values["pruning_profiles"] = PruningProfiles(values["pruning_profiles"])
+    return ServiceSnapshot(**values)
+
+
+class ServiceCache:
+    """Cache service snapshots by UUID.
+
+    Concurrent lookups of the same missing UUID share a single database query.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._cache: LRUCache[str, ServiceSnapshot] = LRUCache(maxsize, ttl)
+        self._loading: SingleFlight[str, ServiceSnapshot | None] = SingleFlight()
+        self._invalidations = 0
+
+    async def get(self, uuid: str) -> ServiceSnapshot | None:
+        snapshot = self._cache.get(uuid)
+        if snapshot is not None:
+            return snapshot
+        return await self._loading.do(uuid, partial(self._load, uuid))
+
+    async def _load(self, uuid: str) -> ServiceSnapshot | None:
+        invalidations = self._invalidations
+        snapshot = await load_service_snapshot(uuid)
+        # Don't store what may have been read before an invalidation
+        if snapshot is not None and invalidations == self._invalidations:
+            self._cache.set(uuid, snapshot)
+        return snapshot
+
+    def invalidate(self, uuid: str) -> None:
+        log.debug("Removing service %s from the cache", uuid)
+        self._invalidations += 1
+        self._cache.delete(uuid)
+
+
+@cache
+def get_service_cache() -> ServiceCache:
+    config = get_config()
+    return ServiceCache(maxsize=config.cache.services_size, ttl=config.cache.services_ttl)